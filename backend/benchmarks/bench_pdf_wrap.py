@@ -0,0 +1,103 @@
+"""Benchmark PDF line wrapping on novel-length paragraphs
+
+Compares PDFService._wrap_text, which sums cached per-glyph advance widths,
+with the previous wrapper that measured the whole growing line with
+font.getbbox for every character. Also reports how many lines differ:
+the new widths are sums of advances rather than ink bounding boxes, so a
+line can occasionally break one character earlier.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf_wrap
+    PDF_BENCH_FONT=/path/to/NotoSansJP-Regular.otf python -m benchmarks.bench_pdf_wrap
+
+Without PDF_BENCH_FONT the font PDFService would pick for body text is used.
+"""
+import logging
+import os
+import random
+import timeit
+
+from PIL import ImageFont
+
+from services.fake_gemini import FAKE_SENTENCES
+from services.pdf_service import BREAK_CHARS, PDFService
+
+FONT_SIZE = 18
+# safe_text_width for the 1024px-wide background page
+MAX_WIDTH = int((1024 - int(1024 * 0.20) * 2) * 0.95)
+
+
+def legacy_wrap(text, font, max_width):
+    """The previous wrapper: one getbbox call on the whole line per character"""
+    lines = []
+    current_line = ""
+    i = 0
+    while i < len(text):
+        char = text[i]
+        test_line = current_line + char
+        bbox = font.getbbox(test_line)
+        if bbox[2] - bbox[0] <= max_width:
+            current_line = test_line
+        elif current_line:
+            break_pos = -1
+            for j in range(len(current_line) - 1, -1, -1):
+                if current_line[j] in BREAK_CHARS:
+                    break_pos = j + 1
+                    break
+            if 0 < break_pos < len(current_line):
+                lines.append(current_line[:break_pos].strip())
+                current_line = current_line[break_pos:].strip() + char
+            else:
+                lines.append(current_line.strip())
+                current_line = char
+        else:
+            current_line = char
+        i += 1
+    if current_line.strip():
+        lines.append(current_line.strip())
+    return [line for line in lines if line]
+
+
+def paragraph(length, rng):
+    parts = []
+    size = 0
+    while size < length:
+        sentence = rng.choice(FAKE_SENTENCES)
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+
+def main():
+    logging.disable(logging.WARNING)
+    service = PDFService()
+    font_path = os.getenv("PDF_BENCH_FONT")
+    font = ImageFont.truetype(font_path, FONT_SIZE) if font_path else service._get_font(FONT_SIZE, "regular")
+    print(f"font: {getattr(font, 'path', font)!r} size {FONT_SIZE}, max width {MAX_WIDTH}px")
+
+    rng = random.Random(42)
+    print(f"{'chars':>7} {'lines':>6} {'legacy':>12} {'cached':>12} {'speedup':>8} {'diff lines':>11}")
+    for length in (200, 2_000, 10_000):
+        text = paragraph(length, rng)
+        expected = legacy_wrap(text, font, MAX_WIDTH)
+        lines = service._wrap_text(text, font, MAX_WIDTH)
+        assert "".join(lines) == "".join(expected), "wrapping lost or reordered text"
+        differing = sum(1 for a, b in zip(lines, expected) if a != b) + abs(len(lines) - len(expected))
+
+        number = max(1, 2_000 // length)
+        legacy = min(timeit.repeat(lambda: legacy_wrap(text, font, MAX_WIDTH), number=number, repeat=3)) / number
+        # A fresh font each round so the glyph cache starts cold, as on the first PDF
+        cold = []
+        for _ in range(3):
+            fresh = ImageFont.truetype(font.path, FONT_SIZE) if isinstance(font.path, str) else font
+            service._glyph_advances.pop(fresh, None)
+            cold.append(timeit.timeit(lambda: service._wrap_text(text, fresh, MAX_WIDTH), number=1))
+        cached = min(cold)
+        print(
+            f"{len(text):>7} {len(lines):>6} {legacy * 1000:>9.2f} ms {cached * 1000:>9.2f} ms "
+            f"{legacy / cached:>7.1f}x {differing:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
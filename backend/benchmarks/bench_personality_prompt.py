@@ -0,0 +1,61 @@
+"""Benchmark personality prompt construction
+
+Compares rendering the prompt from scratch on every call with the memoized
+lookup used by GeminiService.
+
+Usage (from backend/):
+    python -m benchmarks.bench_personality_prompt
+"""
+import itertools
+import random
+import timeit
+
+from services.personality_profile import (
+    PREFERENCES,
+    build_personality_prompt,
+    compile_personality_prompt,
+    get_cache_stats,
+    normalize_answers,
+)
+
+QUESTION_IDS = list(PREFERENCES.keys())
+
+
+def uncached_prompt(quiz_answers):
+    """Render the prompt without consulting the profile cache"""
+    return compile_personality_prompt.__wrapped__(normalize_answers(quiz_answers))
+
+
+def main():
+    # Realistic traffic: a few hundred popular answer sets, requested repeatedly
+    rng = random.Random(42)
+    all_profiles = list(itertools.product("abc", repeat=len(QUESTION_IDS)))
+    popular = [dict(zip(QUESTION_IDS, combo)) for combo in rng.sample(all_profiles, 300)]
+    workload = [rng.choice(popular) for _ in range(20000)]
+    
+    # Three prompts are built per story phase, so repeat each request three times
+    calls = len(workload) * 3
+    
+    def run_uncached():
+        for answers in workload:
+            for _ in range(3):
+                uncached_prompt(answers)
+    
+    def run_cached():
+        for answers in workload:
+            for _ in range(3):
+                build_personality_prompt(answers)
+    
+    compile_personality_prompt.cache_clear()
+    uncached = min(timeit.repeat(run_uncached, number=1, repeat=5))
+    cached = min(timeit.repeat(run_cached, number=1, repeat=5))
+    
+    print(f"calls per run:   {calls}")
+    print(f"uncached:        {uncached * 1e6 / calls:.2f} us/call")
+    print(f"memoized:        {cached * 1e6 / calls:.2f} us/call")
+    print(f"speedup:         {uncached / cached:.1f}x")
+    print(f"cache:           {get_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
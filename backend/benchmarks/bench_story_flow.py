@@ -0,0 +1,126 @@
+"""Benchmark the full story flow against the fake Gemini backend
+
+Drives create -> 4 chat turns -> complete for many simulated users in-process
+and reports throughput, per-endpoint latency and event-loop lag. Gemini is
+replaced by FakeGeminiService, so the numbers reflect the backend itself.
+
+Usage (from backend/):
+    python -m benchmarks.bench_story_flow --users 200 --concurrency 50
+    FAKE_GEMINI_LATENCY_MS=500 python -m benchmarks.bench_story_flow --stream
+
+Firestore is used as configured; without credentials the service runs in its
+development fallback mode.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+
+os.environ["GEMINI_BACKEND"] = "fake"
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SPECULATIVE_FINAL_STORY", "true")
+
+import httpx
+
+from services.model_router import percentile
+
+CHAT_TURNS = 4
+QUIZ_ANSWERS = {f"q{i}": "abc"[i % 3] for i in range(1, 11)}
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes up a periodic timer"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(loop.time() - start - self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def run_user(client, latencies, stream: bool):
+    """One user's full story: opening, chat turns and completion"""
+    async def timed(name, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        latencies[name].append(time.perf_counter() - start)
+        response.raise_for_status()
+        return response
+
+    response = await timed("create", "POST", "/stories", json={"quizAnswers": QUIZ_ANSWERS})
+    story_id = response.json()["storyId"]
+
+    chat_path = "chat/stream" if stream else "chat"
+    for turn in range(CHAT_TURNS):
+        await timed("chat", "POST", f"/stories/{story_id}/{chat_path}", json={"message": f"行動{turn}"})
+
+    await timed("complete", "POST", f"/stories/{story_id}/complete")
+
+
+async def main(users: int, concurrency: int, stream: bool):
+    import main as app_module
+
+    app = app_module.app
+    latencies = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def bounded_user(client):
+        nonlocal failures
+        async with semaphore:
+            try:
+                await run_user(client, latencies, stream)
+            except Exception as e:
+                failures += 1
+                logging.getLogger(__name__).warning(f"User flow failed: {str(e)}")
+
+    await app.router.startup()
+    monitor = LoopLagMonitor()
+    monitor.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded_user(client) for _ in range(users)))
+        elapsed = time.perf_counter() - start
+    await monitor.stop()
+    await app.router.shutdown()
+
+    total_requests = sum(len(samples) for samples in latencies.values())
+    print(f"users:            {users} (concurrency {concurrency}, {'streaming' if stream else 'plain'} chat)")
+    print(f"fake latency:     {os.getenv('FAKE_GEMINI_LATENCY_MS', '3000')} ms median")
+    print(f"elapsed:          {elapsed:.2f} s")
+    print(f"requests:         {total_requests} ({failures} failed flows)")
+    print(f"throughput:       {total_requests / elapsed:.1f} requests/s, {users / elapsed:.2f} stories/s")
+    for name, samples in latencies.items():
+        print(f"{name + ':':<17} p50 {percentile(samples, 50) * 1000:.0f} ms, p95 {percentile(samples, 95) * 1000:.0f} ms")
+    if monitor.samples:
+        print(
+            f"event-loop lag:   p50 {percentile(monitor.samples, 50) * 1000:.1f} ms, "
+            f"p99 {percentile(monitor.samples, 99) * 1000:.1f} ms, max {max(monitor.samples) * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--stream", action="store_true", help="use the SSE chat endpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(args.users, args.concurrency, args.stream))
@@ -0,0 +1,100 @@
+"""Benchmark TTS text segmentation on long novels
+
+Compares the linear sentence packer behind TTSService.split_text_for_tts
+with the previous slice-and-rfind splitter, and checks that every chunk fits
+the limit and that no text is lost.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tts_segmenter
+"""
+import random
+import timeit
+
+from services.text_segmenter import segment_text
+
+LIMIT = 2300
+SENTENCES = [
+    "廊下の奥で、誰かが爪で壁を引っかく音がした。",
+    "振り返っても、そこには湿った足跡が残っているだけだった。",
+    "「誰かいるの？」",
+    "あなたの耳元で、聞き覚えのない声が名前を呼ぶ！",
+    "古い鏡の中のあなたは、ほんの少しだけ遅れて瞬きをした。\n",
+    "The door creaked open.",
+    "冷たい指先が首筋をなぞり、すぐに消えた。\n\n",
+]
+
+
+def legacy_split(text, safe_char_limit=LIMIT):
+    """The previous splitter: re-slices the remainder and runs six rfind scans per chunk"""
+    if len(text) <= safe_char_limit:
+        return [text]
+    chunks = []
+    remaining_text = text
+    while len(remaining_text) > safe_char_limit:
+        chunk = remaining_text[:safe_char_limit]
+        break_points = [
+            chunk.rfind('。'), chunk.rfind('.'), chunk.rfind('！'),
+            chunk.rfind('？'), chunk.rfind('\n\n'), chunk.rfind('\n')
+        ]
+        candidates = [bp for bp in break_points if bp > safe_char_limit * 0.7]
+        if not candidates:
+            # The old code raised ValueError here (max() of an empty list)
+            raise ValueError("no break point in the last 30% of the window")
+        best_break = max(candidates)
+        chunks.append(remaining_text[:best_break + 1].strip())
+        remaining_text = remaining_text[best_break + 1:].strip()
+    if remaining_text.strip():
+        chunks.append(remaining_text.strip())
+    return chunks
+
+
+def novel(length, rng):
+    parts = []
+    size = 0
+    while size < length:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+
+def check(text, spans):
+    """Every chunk fits and only whitespace lies between chunks"""
+    assert all(end - start <= LIMIT for start, end in spans)
+    position = 0
+    for start, end in spans:
+        assert not text[position:start].strip(), "text lost between chunks"
+        position = end
+    assert not text[position:].strip(), "text lost at the end"
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'chars':>9} {'chunks':>7} {'legacy':>12} {'packer':>12} {'speedup':>8}")
+    for length in (2_000, 20_000, 200_000, 2_000_000):
+        text = novel(length, rng)
+        spans = segment_text(text, LIMIT)
+        check(text, spans)
+
+        number = max(1, 200_000 // length)
+        legacy = min(timeit.repeat(lambda: legacy_split(text), number=number, repeat=5)) / number
+        packed = min(timeit.repeat(lambda: segment_text(text, LIMIT), number=number, repeat=5)) / number
+        print(
+            f"{len(text):>9} {len(spans):>7} {legacy * 1000:>9.3f} ms {packed * 1000:>9.3f} ms "
+            f"{legacy / packed:>7.1f}x"
+        )
+
+    # Text without any sentence boundary: the legacy splitter raised here
+    unbroken = "あ" * 10_000
+    spans = segment_text(unbroken, LIMIT)
+    check(unbroken, spans)
+    try:
+        legacy_split(unbroken)
+        legacy_result = "ok"
+    except ValueError:
+        legacy_result = "ValueError"
+    print(f"no boundaries:   {len(spans)} chunks (legacy: {legacy_result})")
+
+
+if __name__ == "__main__":
+    main()
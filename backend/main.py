@@ -1,19 +1,29 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, EmailStr
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional, Tuple
 import os
+import re
+import json
+import math
+import asyncio
 import uuid
 from datetime import datetime
+from urllib.parse import urlencode
 import logging
 
 from services.firestore_service import FirestoreService
 from services.gemini_service import GeminiService
 from services.pdf_service import PDFService
 from services.email_service import EmailService
-from services.tts_service import TTSService
+from services.tts_service import (
+    FALLBACK_TTS_MODEL, MAX_CHUNK_CHARS, MAX_TTS_SPEED, MIN_TTS_SPEED, TTS_MODEL, TTS_VOICES, TTSService,
+    synthesis_speed
+)
+from services.single_flight import SingleFlight
+from services.opening_pool import OpeningPool
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -40,7 +50,12 @@ app.add_middleware(
 
 # Initialize services
 firestore_service = FirestoreService()
-gemini_service = GeminiService()
+if os.getenv("GEMINI_BACKEND", "gemini").lower() == "fake":
+    # Offline stand-in for benchmarking without calling the Gemini API
+    from services.fake_gemini import FakeGeminiService
+    gemini_service = FakeGeminiService()
+else:
+    gemini_service = GeminiService()
 pdf_service = PDFService()
 email_service = EmailService()
 
@@ -51,6 +66,87 @@ except Exception as e:
     logger.warning(f"Failed to initialize TTS service: {str(e)}")
     tts_service = None
 
+# Pre-generated story openings per quiz profile (opt-in)
+opening_pool = None
+if os.getenv("OPENING_POOL_ENABLED", "false").lower() == "true":
+    opening_pool = OpeningPool(
+        gemini_service.generate_initial_story,
+        low_watermark=int(os.getenv("OPENING_POOL_LOW_WATERMARK", "1")),
+        high_watermark=int(os.getenv("OPENING_POOL_HIGH_WATERMARK", "3")),
+        max_profiles=int(os.getenv("OPENING_POOL_MAX_PROFILES", "256")),
+        workers=int(os.getenv("OPENING_POOL_WORKERS", "2"))
+    )
+
+@app.on_event("startup")
+async def start_background_workers():
+    if opening_pool:
+        opening_pool.start()
+    # Load PDF fonts and the background once, so the first PDF is not slower
+    await asyncio.to_thread(pdf_service.warm_up)
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    if opening_pool:
+        await opening_pool.stop()
+    if tts_service:
+        tts_service.store.flush()
+        await tts_service.close()
+
+# Expensive per-story operations are deduplicated across concurrent requests
+single_flight = SingleFlight()
+USE_FIRESTORE_LEASE = os.getenv("SINGLE_FLIGHT_FIRESTORE_LEASE", "false").lower() == "true"
+LEASE_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_LEASE_TTL", "300"))
+
+async def _run_single_flight(operation: str, story_id: str, func, *variant):
+    """Run an operation once per story across concurrent callers (and instances, if leases are enabled)"""
+    async def leader():
+        if not USE_FIRESTORE_LEASE:
+            return await func()
+        
+        owner = str(uuid.uuid4())
+        # As specific as the in-process key, so different variants never contend
+        lease = ":".join([operation, *(str(part) for part in variant)])
+        if not await firestore_service.acquire_lease(story_id, lease, owner, LEASE_TTL_SECONDS):
+            raise HTTPException(status_code=409, detail="This operation is already in progress. Please retry shortly.")
+        try:
+            return await func()
+        finally:
+            await firestore_service.release_lease(story_id, lease, owner)
+    
+    return await single_flight.run((operation, story_id, *variant), leader)
+
+# Final novel generation started speculatively after the last chat turn
+FINAL_TURN = 4
+SPECULATIVE_FINAL_STORY = os.getenv("SPECULATIVE_FINAL_STORY", "true").lower() == "true"
+
+async def _prefetch_final_story(story_id: str, quiz_answers: Dict[str, str], chat_history: List[Dict[str, str]]) -> str:
+    """Generate the final novel in the background and store it as a draft"""
+    final_story = await gemini_service.generate_final_story(quiz_answers, chat_history, story_id=story_id)
+    await firestore_service.update_story(story_id, {
+        "draftNovel": final_story,
+        "draftChatLength": len(chat_history),
+        "updatedAt": datetime.now()
+    })
+    logger.info(f"Speculative final novel ready for story {story_id}")
+    return final_story
+
+def _schedule_final_story(story_id: str, quiz_answers: Dict[str, str], chat_history: List[Dict[str, str]]) -> None:
+    """Start final novel generation once the conclusion turn has been written"""
+    user_turns = len([msg for msg in chat_history if msg["role"] == "user"])
+    if not SPECULATIVE_FINAL_STORY or user_turns != FINAL_TURN:
+        return
+    
+    history = list(chat_history)
+    # Keyed on the history length so completion only adopts a draft of the same conversation
+    single_flight.start(
+        ("draft_novel", story_id, len(history)),
+        lambda: _prefetch_final_story(story_id, quiz_answers, history)
+    )
+    logger.info(f"Started speculative final novel generation for story {story_id}")
+
+# Opt-in synthesis of the first audio chunk as soon as a story is completed
+PREFETCH_FIRST_CHUNK = os.getenv("TTS_PREFETCH_FIRST_CHUNK", "false").lower() == "true"
+
 # Pydantic models
 class QuizAnswers(BaseModel):
     quizAnswers: Dict[str, str]
@@ -68,6 +164,13 @@ class ChatHistory(BaseModel):
 class TTSRequest(BaseModel):
     voice: Optional[str] = "onyx"
     speed: Optional[float] = 0.8
+    # Opus is a smaller alternative for single chunks; full narration is MP3 only
+    response_format: Literal["mp3", "opus"] = "mp3"
+
+class AudioChunksRequest(TTSRequest):
+    # Chunk range [start, end); end defaults to the last chunk
+    start: int = 0
+    end: Optional[int] = None
 
 @app.get("/")
 async def root():
@@ -78,14 +181,27 @@ async def health_check():
     logger.info("Health check requested")
     return {"status": "healthy", "tts_enabled": tts_service.enabled if tts_service else False}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime statistics for monitoring"""
+    return {
+        "gemini": gemini_service.get_stats(),
+        "single_flight": single_flight.get_stats(),
+        "opening_pool": opening_pool.get_stats() if opening_pool else None,
+        "audio_store": tts_service.store.get_stats() if tts_service else None,
+        "pdf": pdf_service.get_stats()
+    }
+
 @app.post("/stories")
 async def create_story(quiz_data: QuizAnswers):
     """Start a new story based on quiz answers"""
     try:
         story_id = str(uuid.uuid4())
         
-        # Generate initial story message using Gemini
-        initial_message = await gemini_service.generate_initial_story(quiz_data.quizAnswers)
+        # Serve a pre-generated opening when available, otherwise generate one now
+        initial_message = opening_pool.take(quiz_data.quizAnswers) if opening_pool else None
+        if not initial_message:
+            initial_message = await gemini_service.generate_initial_story(quiz_data.quizAnswers)
         
         # Create story document in Firestore
         story_data = {
@@ -123,7 +239,8 @@ async def send_chat_message(story_id: str, chat_data: ChatMessage):
         # Generate AI response
         ai_response = await gemini_service.generate_response(
             story.get("quizAnswers", {}), 
-            chat_history
+            chat_history,
+            story_id=story_id
         )
         
         # Add AI response to chat history
@@ -135,6 +252,8 @@ async def send_chat_message(story_id: str, chat_data: ChatMessage):
             "updatedAt": datetime.now()
         })
         
+        _schedule_final_story(story_id, story.get("quizAnswers", {}), chat_history)
+        
         return {"reply": ai_response}
     
     except HTTPException:
@@ -143,6 +262,101 @@ async def send_chat_message(story_id: str, chat_data: ChatMessage):
         logger.error(f"Error processing chat message: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to process message")
 
+def _sse_event(event: str, data: Dict) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/stories/{story_id}/chat/stream")
+async def stream_chat_message(story_id: str, chat_data: ChatMessage):
+    """Send a chat message and stream the AI response as Server-Sent Events"""
+    # Get story from Firestore
+    story = await firestore_service.get_story(story_id)
+    if not story:
+        raise HTTPException(status_code=404, detail="Story not found")
+    
+    # Add user message to chat history
+    chat_history = story.get("chatHistory", [])
+    chat_history.append({"role": "user", "content": chat_data.message})
+    
+    async def event_stream():
+        try:
+            # Forward Gemini chunks as they arrive
+            parts = []
+            async for text in gemini_service.stream_response(story.get("quizAnswers", {}), chat_history, story_id=story_id):
+                parts.append(text)
+                yield _sse_event("delta", {"text": text})
+            
+            ai_response = "".join(parts).strip()
+            
+            # Persist the completed turn before signalling completion
+            chat_history.append({"role": "model", "content": ai_response})
+            await firestore_service.update_story(story_id, {
+                "chatHistory": chat_history,
+                "updatedAt": datetime.now()
+            })
+            
+            _schedule_final_story(story_id, story.get("quizAnswers", {}), chat_history)
+            
+            yield _sse_event("done", {"reply": ai_response})
+        
+        except Exception as e:
+            logger.error(f"Error streaming chat message: {str(e)}")
+            yield _sse_event("error", {"detail": "Failed to process message"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _finalize_story(story_id: str, story: Dict) -> str:
+    """Produce the final novel and mark the story as completed"""
+    chat_history = story.get("chatHistory", [])
+    final_story = None
+    
+    # Use the speculatively generated novel when it matches the current conversation
+    pending = single_flight.get(("draft_novel", story_id, len(chat_history)))
+    if pending:
+        try:
+            final_story = await asyncio.shield(pending)
+            logger.info(f"Using in-flight speculative novel for story {story_id}")
+        except Exception as e:
+            logger.warning(f"Speculative novel unavailable for story {story_id}: {str(e)}")
+    elif story.get("draftNovel") and story.get("draftChatLength") == len(chat_history):
+        final_story = story.get("draftNovel")
+        logger.info(f"Using stored speculative novel for story {story_id}")
+    
+    # Generate final story text
+    if not final_story:
+        final_story = await gemini_service.generate_final_story(
+            story.get("quizAnswers", {}),
+            chat_history,
+            story_id=story_id
+        )
+    
+    # Split once here so the chunk endpoints never re-split the novel
+    manifest = tts_service.build_chunk_manifest(final_story) if tts_service else None
+    
+    # Update story in Firestore with completed novel
+    await firestore_service.update_story(story_id, {
+        "novel": final_story,
+        "status": "completed",
+        "draftNovel": None,
+        "updatedAt": datetime.now(),
+        # Clear any cached audio info when story is regenerated
+        "audioUrl": None,
+        "audioChunks": None,
+        "audioManifest": manifest
+    })
+    
+    # The conversation is finished, so its rendered context is no longer needed
+    gemini_service.context_cache.discard(story_id)
+    
+    if manifest:
+        _schedule_first_chunk(story_id, manifest)
+    
+    return final_story
+
 @app.post("/stories/{story_id}/complete")
 async def complete_story(story_id: str):
     """Complete story and generate final novel text"""
@@ -160,27 +374,16 @@ async def complete_story(story_id: str):
                 "novel": story.get("novel")
             }
         
-        # Generate final story text
-        final_story = await gemini_service.generate_final_story(
-            story.get("quizAnswers", {}),
-            story.get("chatHistory", [])
-        )
-        
-        # Update story in Firestore with completed novel
-        await firestore_service.update_story(story_id, {
-            "novel": final_story,
-            "status": "completed",
-            "updatedAt": datetime.now(),
-            # Clear any cached audio info when story is regenerated
-            "audioUrl": None,
-            "audioChunks": None
-        })
+        # Concurrent requests for the same story share one generation
+        final_story = await _run_single_flight("complete", story_id, lambda: _finalize_story(story_id, story))
         
         return {
             "message": "Story completed successfully",
             "novel": final_story
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error completing story: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to complete story")
@@ -227,6 +430,38 @@ async def send_story_email(story_id: str, finish_data: FinishStory):
         logger.error(f"Error sending story email: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to send story email")
 
+async def _synthesize_story_audio(story_id: str, cleaned_text: str, cache_key: str, voice: str, speed: float) -> str:
+    """Synthesize narration for the whole novel, save it and record the URL"""
+    # Synthesize every chunk concurrently and join them into one MP3
+    logger.info("Starting OpenAI TTS generation...")
+    audio_content, model = await tts_service.generate_full_speech(
+        text=cleaned_text,
+        voice=voice,
+        speed=speed,
+        story_id=story_id
+    )
+    logger.info(f"TTS generation completed, audio size: {len(audio_content)} bytes")
+    
+    # Fallback audio must not be cached as the primary model's narration
+    if model != TTS_MODEL:
+        cache_key = tts_service.generate_cache_key(cleaned_text, voice, speed, model=model)
+    
+    # A single-chunk novel is already cached under the same key by its chunk
+    audio_url = tts_service.get_cached_audio_url(cache_key) or await tts_service.save_audio_file(audio_content, cache_key, story_id)
+    
+    # Update Firestore with audio URL
+    await firestore_service.update_story(story_id, {
+        "audioUrl": audio_url,
+        "audioSettings": {
+            "voice": voice,
+            "speed": speed
+        },
+        "updatedAt": datetime.now()
+    })
+    
+    logger.info(f"Audio generated and saved for story {story_id}: {audio_url}")
+    return audio_url
+
 @app.post("/stories/{story_id}/generate-audio")
 async def generate_story_audio(story_id: str, tts_request: TTSRequest = TTSRequest()):
     """Generate audio narration of the completed story using OpenAI TTS"""
@@ -251,15 +486,9 @@ async def generate_story_audio(story_id: str, tts_request: TTSRequest = TTSReque
         if story.get("status") != "completed" or not story.get("novel"):
             raise HTTPException(status_code=400, detail="Story is not completed yet")
         
-        # Check if audio already exists in cache
-        cached_audio_url = tts_service.get_cached_audio_url(story_id)
-        if cached_audio_url and story.get("audioUrl"):
-            logger.info(f"Returning cached audio URL for story {story_id}")
-            return {
-                "audioUrl": cached_audio_url,
-                "cached": True,
-                "message": "音声ファイルはキャッシュから取得されました"
-            }
+        # Chunks are joined frame by frame, which only works for MP3
+        if tts_request.response_format != "mp3":
+            raise HTTPException(status_code=400, detail="Full narration is only available as mp3")
         
         # Get the completed novel text
         novel_text = story.get("novel")
@@ -271,32 +500,24 @@ async def generate_story_audio(story_id: str, tts_request: TTSRequest = TTSReque
         
         # Clean and prepare text for TTS
         cleaned_text = tts_service.clean_text_for_speech(novel_text)
-        logger.info(f"Cleaned text length: {len(cleaned_text)} characters")
-        
-        # Generate audio using OpenAI TTS
-        logger.info("Starting OpenAI TTS generation...")
-        audio_content = await tts_service.generate_speech(
-            text=cleaned_text,
-            voice=tts_request.voice,
-            speed=tts_request.speed,
-            response_format="mp3"
-        )
-        logger.info(f"TTS generation completed, audio size: {len(audio_content)} bytes")
-        
-        # Save audio file to disk
-        audio_url = tts_service.save_audio_file(audio_content, story_id)
+        cache_key = tts_service.generate_cache_key(cleaned_text, tts_request.voice, tts_request.speed)
         
-        # Update Firestore with audio URL
-        await firestore_service.update_story(story_id, {
-            "audioUrl": audio_url,
-            "audioSettings": {
-                "voice": tts_request.voice,
-                "speed": tts_request.speed
-            },
-            "updatedAt": datetime.now()
-        })
+        # Check if audio for this exact text and settings already exists in cache
+        cached_audio_url = tts_service.get_cached_audio_url(cache_key)
+        if cached_audio_url:
+            logger.info(f"Returning cached audio URL for story {story_id}")
+            return {
+                "audioUrl": cached_audio_url,
+                "cached": True,
+                "message": "音声ファイルはキャッシュから取得されました"
+            }
         
-        logger.info(f"Audio generated and saved for story {story_id}: {audio_url}")
+        # Concurrent requests for the same story and settings share one synthesis
+        audio_url = await _run_single_flight(
+            "audio", story_id,
+            lambda: _synthesize_story_audio(story_id, cleaned_text, cache_key, tts_request.voice, tts_request.speed),
+            tts_request.voice, tts_request.speed
+        )
         
         return {
             "audioUrl": audio_url,
@@ -310,14 +531,200 @@ async def generate_story_audio(story_id: str, tts_request: TTSRequest = TTSReque
         logger.error(f"Error generating story audio: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate story audio")
 
+def _validate_tts_settings(voice: str, speed: float) -> None:
+    """Reject query-string voice and speed values the TTS API would refuse"""
+    if voice not in TTS_VOICES:
+        raise HTTPException(status_code=400, detail=f"Unsupported voice: {voice}")
+    if not MIN_TTS_SPEED <= speed <= MAX_TTS_SPEED:
+        raise HTTPException(status_code=400, detail=f"Speed must be between {MIN_TTS_SPEED} and {MAX_TTS_SPEED}")
+
+def _discard_partial_audio(audio_file, temp_path: str) -> None:
+    """Close and delete an unfinished streamed narration file"""
+    if audio_file is not None:
+        audio_file.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+async def _tee_story_audio(story_id: str, cleaned_text: str, cache_key: str, voice: str, speed: float):
+    """Yield streamed narration while writing it to the audio cache"""
+    temp_path = tts_service.store.temp_path(cache_key)
+    completed = False
+    models = []
+    
+    audio_file = None
+    try:
+        # File I/O runs in worker threads so a slow disk does not stall the event loop
+        audio_file = await asyncio.to_thread(open, temp_path, "wb")
+        async for data in tts_service.stream_speech(cleaned_text, voice, speed, "mp3", models):
+            await asyncio.to_thread(audio_file.write, data)
+            yield data
+        await asyncio.to_thread(audio_file.close)
+        completed = True
+    except Exception as e:
+        # Headers are already sent, so the client just sees the stream end early
+        logger.error(f"Error streaming story audio: {str(e)}")
+    finally:
+        if not completed:
+            await asyncio.to_thread(_discard_partial_audio, audio_file, temp_path)
+    
+    if completed:
+        # Fallback audio must not be cached as the primary model's narration
+        if any(model != TTS_MODEL for model in models):
+            cache_key = tts_service.generate_cache_key(cleaned_text, voice, speed, model=FALLBACK_TTS_MODEL)
+        audio_url = await tts_service.commit_audio_file(temp_path, cache_key, story_id)
+        await firestore_service.update_story(story_id, {
+            "audioUrl": audio_url,
+            "audioSettings": {
+                "voice": voice,
+                "speed": speed
+            },
+            "updatedAt": datetime.now()
+        })
+        logger.info(f"Streamed audio saved for story {story_id}: {audio_url}")
+
+@app.get("/stories/{story_id}/audio-stream")
+async def stream_story_audio(story_id: str, voice: str = "onyx", speed: float = 0.8):
+    """Stream narration of the completed story while it is being synthesized"""
+    logger.info(f"Received audio stream request for story: {story_id} (voice={voice}, speed={speed})")
+    
+    if not tts_service or not tts_service.enabled:
+        raise HTTPException(status_code=503, detail="TTS service is not available")
+    
+    _validate_tts_settings(voice, speed)
+    
+    story = await firestore_service.get_story(story_id)
+    if not story:
+        raise HTTPException(status_code=404, detail="Story not found")
+    
+    if story.get("status") != "completed" or not story.get("novel"):
+        raise HTTPException(status_code=400, detail="Story is not completed yet")
+    
+    cleaned_text = tts_service.clean_text_for_speech(story["novel"])
+    cache_key = tts_service.generate_cache_key(cleaned_text, voice, speed)
+    
+    # Serve the finished file when the narration already exists
+    if tts_service.get_cached_audio_url(cache_key):
+        logger.info(f"Serving cached audio file for story {story_id}")
+        return FileResponse(tts_service.audio_file_path(cache_key), media_type="audio/mpeg")
+    
+    return StreamingResponse(
+        _tee_story_audio(story_id, cleaned_text, cache_key, voice, speed),
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def _audio_settings_key(voice: str, speed: float, response_format: str = "mp3") -> str:
+    """Key for one voice/speed/format rendering in the manifest's audio map"""
+    return f"{voice}@{float(speed)}:{response_format}"
+
+def _chunk_audio_urls(manifest: Dict, chunk_id: int) -> Dict[str, str]:
+    """Audio URLs recorded for a chunk, keyed by _audio_settings_key"""
+    # Older manifests kept the URLs on the chunk itself
+    urls = dict(manifest["chunks"][chunk_id].get("audioUrls") or {})
+    urls.update(manifest.get("audio", {}).get(str(chunk_id), {}))
+    return urls
+
+def _record_chunk_audio(manifest: Dict, chunk_id: int, settings_key: str, audio_url: str) -> Tuple[str, ...]:
+    """Record a chunk's audio URL in the manifest and return its Firestore field path
+    
+    Each URL has its own field, so concurrent syntheses of different chunks
+    or settings never overwrite each other's entries.
+    """
+    manifest.setdefault("audio", {}).setdefault(str(chunk_id), {})[settings_key] = audio_url
+    return ("audioManifest", "audio", str(chunk_id), settings_key)
+
+async def _synthesize_chunk(
+    story_id: str,
+    manifest: Dict,
+    chunk_id: int,
+    cache_key: str,
+    voice: str,
+    speed: float,
+    response_format: str = "mp3",
+    persist: bool = True
+) -> str:
+    """Synthesize one manifest chunk, cache it and record its URL in the manifest
+
+    With persist=False the manifest is only updated in memory and the caller
+    writes the URL to Firestore.
+    """
+    chunk = manifest["chunks"][chunk_id]
+    logger.info(f"Generating audio for chunk {chunk_id}, length: {len(chunk['text'])} characters")
+    
+    audio_content, model = await tts_service.generate_speech(
+        text=chunk["text"],
+        voice=voice,
+        speed=speed,
+        response_format=response_format
+    )
+    
+    logger.info(f"Chunk {chunk_id} audio generation completed with {model}, size: {len(audio_content)} bytes")
+    
+    # Fallback audio gets its own key, so the next request retries the primary model
+    if model != TTS_MODEL:
+        cache_key = tts_service.generate_cache_key(
+            chunk["text"], voice, speed, model=model, response_format=response_format
+        )
+    
+    # Save chunk audio file to disk
+    chunk_audio_url = await tts_service.save_audio_file(audio_content, cache_key, story_id, response_format)
+    
+    # Record the chunk's audio in the manifest
+    field = _record_chunk_audio(manifest, chunk_id, _audio_settings_key(voice, speed, response_format), chunk_audio_url)
+    
+    if persist:
+        await firestore_service.update_story_fields(story_id, {
+            field: chunk_audio_url,
+            ("updatedAt",): datetime.now()
+        })
+    return chunk_audio_url
+
+def _schedule_first_chunk(story_id: str, manifest: Dict) -> None:
+    """Start synthesizing chunk 0 with the default settings so first playback hits the cache"""
+    if not PREFETCH_FIRST_CHUNK or not tts_service or not tts_service.enabled or not manifest["chunks"]:
+        return
+    
+    defaults = TTSRequest()
+    cache_key = tts_service.generate_cache_key(manifest["chunks"][0]["text"], defaults.voice, defaults.speed)
+    if tts_service.get_cached_audio_url(cache_key):
+        return
+    
+    # Same key as the chunk endpoint, so a request arriving meanwhile joins this synthesis
+    single_flight.start(
+        ("audio_chunk", cache_key),
+        lambda: _synthesize_chunk(story_id, manifest, 0, cache_key, defaults.voice, defaults.speed)
+    )
+    logger.info(f"Started prefetching the first audio chunk for story {story_id}")
+
+async def _get_chunk_manifest(story_id: str, story: Dict) -> Dict:
+    """Return the story's chunk manifest, building it for stories completed before manifests existed"""
+    manifest = story.get("audioManifest")
+    if manifest:
+        return manifest
+    
+    manifest = tts_service.build_chunk_manifest(story["novel"])
+    await firestore_service.update_story(story_id, {"audioManifest": manifest})
+    logger.info(f"Built missing audio manifest for story {story_id}")
+    return manifest
+
 @app.get("/stories/{story_id}/audio-chunks-info")
-async def get_audio_chunks_info(story_id: str):
-    """Get information about audio chunks for the story"""
+async def get_audio_chunks_info(
+    story_id: str,
+    voice: str = "onyx",
+    speed: float = 0.8,
+    response_format: Literal["mp3", "opus"] = "mp3"
+):
+    """Get information about audio chunks for the story
+    
+    A chunk is ready when its audio for the given settings is in the audio store.
+    """
     try:
         # Check if TTS service is available
         if not tts_service or not tts_service.enabled:
             raise HTTPException(status_code=503, detail="TTS service is not available")
         
+        _validate_tts_settings(voice, speed)
+        
         # Get story from Firestore
         story = await firestore_service.get_story(story_id)
         if not story:
@@ -327,18 +734,28 @@ async def get_audio_chunks_info(story_id: str):
         if story.get("status") != "completed" or not story.get("novel"):
             raise HTTPException(status_code=400, detail="Story is not completed yet")
         
-        # Get the completed novel text
-        novel_text = story.get("novel")
-        cleaned_text = tts_service.clean_text_for_speech(novel_text)
-        chunks = tts_service.split_text_for_tts(cleaned_text)
+        manifest = await _get_chunk_manifest(story_id, story)
+        chunks = manifest["chunks"]
+        
+        # Recorded URLs outlive evicted files, so ask the store; fallback audio is regenerated on request
+        ready = [
+            tts_service.has_cached_audio(
+                tts_service.generate_cache_key(chunk["text"], voice, speed, response_format=response_format),
+                response_format
+            )
+            for chunk in chunks
+        ]
         
         return {
             "total_chunks": len(chunks),
+            # Manifests from before chunk schedules were split at a fixed size
+            "chunk_schedule": manifest.get("schedule", [MAX_CHUNK_CHARS]),
             "chunks_info": [
                 {
                     "chunk_id": i,
-                    "length": len(chunk),
-                    "preview": chunk[:100] + "..." if len(chunk) > 100 else chunk
+                    "length": len(chunk["text"]),
+                    "preview": chunk["text"][:100] + "..." if len(chunk["text"]) > 100 else chunk["text"],
+                    "status": "ready" if ready[i] else "pending"
                 }
                 for i, chunk in enumerate(chunks)
             ]
@@ -369,8 +786,20 @@ async def generate_story_audio_chunk(story_id: str, chunk_id: int, tts_request:
         if story.get("status") != "completed" or not story.get("novel"):
             raise HTTPException(status_code=400, detail="Story is not completed yet")
         
-        # Check if this chunk is already cached
-        cached_chunk_url = tts_service.get_cached_audio_url(story_id, chunk_id)
+        # Chunks were split once when the story was completed
+        manifest = await _get_chunk_manifest(story_id, story)
+        chunks = manifest["chunks"]
+        
+        if chunk_id < 0 or chunk_id >= len(chunks):
+            raise HTTPException(status_code=400, detail="Chunk ID out of range")
+        
+        # Check if this chunk text with these settings is already cached
+        chunk_text = chunks[chunk_id]["text"]
+        response_format = tts_request.response_format
+        cache_key = tts_service.generate_cache_key(
+            chunk_text, tts_request.voice, tts_request.speed, response_format=response_format
+        )
+        cached_chunk_url = tts_service.get_cached_audio_url(cache_key, response_format)
         if cached_chunk_url:
             logger.info(f"Returning cached audio chunk {chunk_id} for story {story_id}")
             return {
@@ -379,44 +808,19 @@ async def generate_story_audio_chunk(story_id: str, chunk_id: int, tts_request:
                 "cached": True
             }
         
-        # Get the completed novel text and split into chunks
-        novel_text = story.get("novel")
-        cleaned_text = tts_service.clean_text_for_speech(novel_text)
-        chunks = tts_service.split_text_for_tts(cleaned_text)
-        
-        if chunk_id >= len(chunks):
-            raise HTTPException(status_code=400, detail="Chunk ID out of range")
-        
-        # Generate audio for the specific chunk
-        chunk_text = chunks[chunk_id]
-        logger.info(f"Generating audio for chunk {chunk_id}, length: {len(chunk_text)} characters")
-        
-        audio_content = await tts_service.generate_speech(
-            text=chunk_text,
-            voice=tts_request.voice,
-            speed=tts_request.speed,
-            response_format="mp3"
+        # Concurrent requests (and the first-chunk prefetch) share one synthesis
+        chunk_audio_url = await single_flight.run(
+            ("audio_chunk", cache_key),
+            lambda: _synthesize_chunk(
+                story_id, manifest, chunk_id, cache_key, tts_request.voice, tts_request.speed, response_format
+            )
         )
         
-        logger.info(f"Chunk {chunk_id} audio generation completed, size: {len(audio_content)} bytes")
-        
-        # Save chunk audio file to disk
-        chunk_audio_url = tts_service.save_audio_file(audio_content, story_id, chunk_id)
-        
-        # Update audio chunks info in Firestore - 安全に処理
-        audio_chunks = story.get("audioChunks") or {}
-        audio_chunks[str(chunk_id)] = {
-            "audioUrl": chunk_audio_url,
-            "settings": {
-                "voice": tts_request.voice,
-                "speed": tts_request.speed
-            }
-        }
-        
-        await firestore_service.update_story(story_id, {
-            "audioChunks": audio_chunks,
-            "updatedAt": datetime.now()
-        })
+        # A joined synthesis may have been started for another chunk with the same text
+        settings_key = _audio_settings_key(tts_request.voice, tts_request.speed, response_format)
+        if _chunk_audio_urls(manifest, chunk_id).get(settings_key) != chunk_audio_url:
+            field = _record_chunk_audio(manifest, chunk_id, settings_key, chunk_audio_url)
+            await firestore_service.update_story_fields(story_id, {field: chunk_audio_url})
         
         return {
             "audioUrl": chunk_audio_url,
@@ -430,6 +834,267 @@ async def generate_story_audio_chunk(story_id: str, chunk_id: int, tts_request:
         logger.error(f"Error generating story audio chunk: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate story audio chunk")
 
+@app.post("/stories/{story_id}/generate-audio-chunks")
+async def generate_story_audio_chunks(story_id: str, chunks_request: AudioChunksRequest = AudioChunksRequest()):
+    """Generate audio for a range of chunks concurrently and record them in one update"""
+    logger.info(
+        f"Received audio chunks generation request for story: {story_id}, "
+        f"chunks: {chunks_request.start}-{chunks_request.end}"
+    )
+    
+    try:
+        if not tts_service or not tts_service.enabled:
+            raise HTTPException(status_code=503, detail="TTS service is not available")
+        
+        story = await firestore_service.get_story(story_id)
+        if not story:
+            raise HTTPException(status_code=404, detail="Story not found")
+        
+        if story.get("status") != "completed" or not story.get("novel"):
+            raise HTTPException(status_code=400, detail="Story is not completed yet")
+        
+        manifest = await _get_chunk_manifest(story_id, story)
+        chunks = manifest["chunks"]
+        
+        start = chunks_request.start
+        end = len(chunks) if chunks_request.end is None else chunks_request.end
+        if start < 0 or end > len(chunks) or start >= end:
+            raise HTTPException(status_code=400, detail="Chunk range out of range")
+        
+        voice = chunks_request.voice
+        speed = chunks_request.speed
+        response_format = chunks_request.response_format
+        settings_key = _audio_settings_key(voice, speed, response_format)
+        semaphore = asyncio.Semaphore(tts_service.max_parallel)
+        fields = {}
+        
+        async def generate(chunk_id: int, cache_key: str) -> str:
+            async with semaphore:
+                # Shares the chunk endpoint's single-flight key; the URLs are written once below
+                return await single_flight.run(
+                    ("audio_chunk", cache_key),
+                    lambda: _synthesize_chunk(
+                        story_id, manifest, chunk_id, cache_key, voice, speed, response_format, persist=False
+                    )
+                )
+        
+        results = {}
+        pending = {}
+        for chunk_id in range(start, end):
+            chunk = chunks[chunk_id]
+            cache_key = tts_service.generate_cache_key(chunk["text"], voice, speed, response_format=response_format)
+            cached_chunk_url = tts_service.get_cached_audio_url(cache_key, response_format)
+            if cached_chunk_url:
+                results[chunk_id] = {"chunkId": chunk_id, "audioUrl": cached_chunk_url, "cached": True}
+                if _chunk_audio_urls(manifest, chunk_id).get(settings_key) != cached_chunk_url:
+                    fields[_record_chunk_audio(manifest, chunk_id, settings_key, cached_chunk_url)] = cached_chunk_url
+            else:
+                pending[chunk_id] = generate(chunk_id, cache_key)
+        
+        outcomes = await asyncio.gather(*pending.values(), return_exceptions=True)
+        failed = []
+        for chunk_id, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Error generating audio chunk {chunk_id} for story {story_id}: {str(outcome)}")
+                failed.append(chunk_id)
+                continue
+            # A synthesis joined from another request recorded its URL in that request's manifest
+            fields[_record_chunk_audio(manifest, chunk_id, settings_key, outcome)] = outcome
+            results[chunk_id] = {"chunkId": chunk_id, "audioUrl": outcome, "cached": False}
+        
+        # Keep whatever succeeded, even if some chunks failed
+        if fields:
+            fields[("updatedAt",)] = datetime.now()
+            await firestore_service.update_story_fields(story_id, fields)
+        
+        if failed:
+            raise HTTPException(status_code=500, detail=f"Failed to generate audio chunks {failed}")
+        
+        return {
+            "chunks": [results[chunk_id] for chunk_id in range(start, end)],
+            "total_chunks": len(chunks)
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating story audio chunks: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate story audio chunks")
+
+# Narration files are content-addressed, so a URL always names the same audio
+AUDIO_FILENAME = re.compile(r"^[A-Za-z0-9_-]+\.(mp3|opus)$")
+AUDIO_MEDIA_TYPES = {"mp3": "audio/mpeg", "opus": "audio/ogg"}
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def _parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range Range header into inclusive (start, end)
+
+    Returns None when the whole file should be sent (no header, or several
+    ranges) and raises ValueError when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    if not (first or last).isdigit() or (first and last and not last.isdigit()):
+        # Malformed ranges are ignored rather than rejected
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length <= 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+def _read_file_range(path: str, start: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+async def _audio_file_response(filename: str, request: Request, cache_control: str = AUDIO_CACHE_CONTROL) -> Response:
+    """Respond with a stored audio file, honouring Range, If-Range and If-None-Match"""
+    entry = tts_service.store.open_entry(filename)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    size = entry["size"]
+    etag = f'"{entry["sha256"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes"
+    }
+    media_type = AUDIO_MEDIA_TYPES[filename.rsplit(".", 1)[1]]
+    
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    # A range is only honoured if the client's copy is still this exact file
+    if_range = request.headers.get("if-range")
+    try:
+        byte_range = _parse_byte_range(request.headers.get("range", ""), size) if if_range in (None, etag) else None
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    
+    if byte_range is None:
+        if request.method == "HEAD":
+            return Response(headers={**headers, "Content-Length": str(size)}, media_type=media_type)
+        return FileResponse(entry["path"], media_type=media_type, headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if request.method == "HEAD":
+        return Response(status_code=206, headers={**headers, "Content-Length": str(end - start + 1)}, media_type=media_type)
+    content = await asyncio.to_thread(_read_file_range, entry["path"], start, end - start + 1)
+    return Response(content=content, status_code=206, headers=headers, media_type=media_type)
+
+@app.api_route("/audio/{filename}", methods=["GET", "HEAD"])
+async def serve_audio(filename: str, request: Request):
+    """Serve narration audio with byte ranges, strong ETags and immutable caching"""
+    if not tts_service or not AUDIO_FILENAME.match(filename):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return await _audio_file_response(filename, request)
+
+# Narration pace used to estimate segment durations before audio exists
+NARRATION_CHARS_PER_SECOND = float(os.getenv("NARRATION_CHARS_PER_SECOND", "7"))
+
+async def _get_narration_manifest(story_id: str) -> Dict:
+    """Chunk manifest of a completed story, for the narration playlist"""
+    if not tts_service or not tts_service.enabled:
+        raise HTTPException(status_code=503, detail="TTS service is not available")
+    
+    story = await firestore_service.get_story(story_id)
+    if not story:
+        raise HTTPException(status_code=404, detail="Story not found")
+    
+    if story.get("status") != "completed" or not story.get("novel"):
+        raise HTTPException(status_code=400, detail="Story is not completed yet")
+    
+    return await _get_chunk_manifest(story_id, story)
+
+def _start_segment(story_id: str, manifest: Dict, index: int, voice: str, speed: float) -> Tuple[str, Optional[asyncio.Task]]:
+    """Return a segment's cache key, starting its synthesis unless it is already cached"""
+    cache_key = tts_service.generate_cache_key(manifest["chunks"][index]["text"], voice, speed)
+    if tts_service.store.open_entry(tts_service.store.filename(cache_key)):
+        return cache_key, None
+    
+    # Shares the chunk endpoint's single-flight key
+    task = single_flight.start(
+        ("audio_chunk", cache_key),
+        lambda: _synthesize_chunk(story_id, manifest, index, cache_key, voice, speed)
+    )
+    return cache_key, task
+
+@app.get("/stories/{story_id}/narration.m3u8")
+async def get_narration_playlist(story_id: str, voice: str = "onyx", speed: float = 0.8):
+    """HLS-style playlist whose segments are the story's audio chunks"""
+    _validate_tts_settings(voice, speed)
+    manifest = await _get_narration_manifest(story_id)
+    chunks = manifest["chunks"]
+    
+    # Get the first segment going before the player asks for it
+    if chunks:
+        _start_segment(story_id, manifest, 0, voice, speed)
+    
+    # Segments already synthesized report their real length; the rest are estimated
+    # at the speed the model is actually asked for
+    durations = []
+    for chunk in chunks:
+        cache_key = tts_service.generate_cache_key(chunk["text"], voice, speed)
+        duration = await tts_service.get_audio_duration(cache_key)
+        if duration is None:
+            duration = max(1.0, len(chunk["text"]) / (NARRATION_CHARS_PER_SECOND * synthesis_speed(speed)))
+        durations.append(duration)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{math.ceil(max(durations, default=1.0))}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD"
+    ]
+    query = urlencode({"voice": voice, "speed": speed})
+    for index, duration in enumerate(durations):
+        lines.append(f"#EXTINF:{duration:.3f},")
+        lines.append(f"narration/{index}.mp3?{query}")
+    lines.append("#EXT-X-ENDLIST")
+    
+    return Response(
+        content="\n".join(lines) + "\n",
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.get("/stories/{story_id}/narration/{index}.mp3")
+async def get_narration_segment(story_id: str, index: int, request: Request, voice: str = "onyx", speed: float = 0.8):
+    """One playlist segment, synthesized on first fetch while the next one is prepared"""
+    _validate_tts_settings(voice, speed)
+    manifest = await _get_narration_manifest(story_id)
+    chunks = manifest["chunks"]
+    if index < 0 or index >= len(chunks):
+        raise HTTPException(status_code=404, detail="Segment not found")
+    
+    try:
+        cache_key, task = _start_segment(story_id, manifest, index, voice, speed)
+        # Synthesize ahead so the next segment is ready when the player gets there
+        if index + 1 < len(chunks):
+            _start_segment(story_id, manifest, index + 1, voice, speed)
+        filename = tts_service.store.filename(cache_key)
+        if task:
+            # Fallback audio is stored under a different key
+            filename = (await asyncio.shield(task)).rsplit("/", 1)[-1]
+    except Exception as e:
+        logger.error(f"Error generating narration segment: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate narration segment")
+    
+    # The segment URL is stable for a completed story, but not content-addressed;
+    # fallback audio is not cached so that a later fetch gets the primary model
+    cache_control = "public, max-age=3600" if filename == tts_service.store.filename(cache_key) else "no-cache"
+    return await _audio_file_response(filename, request, cache_control)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
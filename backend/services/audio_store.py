@@ -0,0 +1,312 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.json"
+
+
+class AudioStore:
+    """Size-bounded audio file cache with least-recently-used eviction
+
+    Files live in one directory under their cache key. An index.json records
+    each entry's size, content hash and last access time plus the entries each
+    story produced; at startup it is reconciled with what is actually on disk.
+
+    The index maps story IDs to their audio, and story IDs must stay private,
+    so the index and in-progress temporary files live in a separate
+    state_directory that is never served. It must be on the same filesystem
+    as directory so that committing a file is an atomic rename.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        state_directory: str,
+        max_bytes: int,
+        url_prefix: str = "/audio",
+        index_save_interval: float = 10.0
+    ):
+        self.directory = directory
+        self.state_directory = state_directory
+        self.max_bytes = max_bytes
+        self.url_prefix = url_prefix
+        self.index_path = os.path.join(self.state_directory, INDEX_FILENAME)
+        # The index is rewritten at most this often; flush() writes it immediately
+        self.index_save_interval = index_save_interval
+        self._index_saved_at = 0.0
+
+        # filename -> {"size", "last_access", "sha256", optional "duration"}, least recently used first
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stories: Dict[str, List[str]] = {}
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        os.makedirs(self.state_directory, exist_ok=True)
+        self._rebuild_index()
+
+    @staticmethod
+    def filename(cache_key: str, response_format: str = "mp3") -> str:
+        return f"{cache_key}.{response_format}"
+
+    def path(self, cache_key: str, response_format: str = "mp3") -> str:
+        """Path of the audio file for a cache key"""
+        return os.path.join(self.directory, self.filename(cache_key, response_format))
+
+    def url(self, cache_key: str, response_format: str = "mp3") -> str:
+        return f"{self.url_prefix}/{self.filename(cache_key, response_format)}"
+
+    def temp_path(self, cache_key: str, response_format: str = "mp3") -> str:
+        """A unique temporary path to write an entry to before committing it"""
+        name = self.filename(cache_key, response_format)
+        return os.path.join(self.state_directory, f"{name}.{uuid.uuid4().hex}.part")
+
+    def lookup(self, cache_key: str, response_format: str = "mp3") -> Optional[str]:
+        """Return the URL of a cached entry and mark it as recently used"""
+        name = self.filename(cache_key, response_format)
+        if name in self._entries and os.path.exists(os.path.join(self.directory, name)):
+            self._touch(name)
+            self.hits += 1
+            return self.url(cache_key, response_format)
+
+        if name in self._entries:
+            # Removed behind our back
+            self._forget(name)
+        self.misses += 1
+        return None
+
+    def contains(self, cache_key: str, response_format: str = "mp3") -> bool:
+        """Whether an entry is stored, without counting a lookup or marking it as used"""
+        name = self.filename(cache_key, response_format)
+        return name in self._entries and os.path.exists(os.path.join(self.directory, name))
+
+    def get_duration(self, cache_key: str, response_format: str = "mp3") -> Optional[float]:
+        """Recorded playing time of a stored entry in seconds, if it has been measured"""
+        entry = self._entries.get(self.filename(cache_key, response_format))
+        return entry.get("duration") if entry else None
+
+    def set_duration(self, cache_key: str, seconds: float, response_format: str = "mp3") -> None:
+        """Record the playing time of a stored entry; it is kept in the index"""
+        entry = self._entries.get(self.filename(cache_key, response_format))
+        if entry is not None:
+            entry["duration"] = seconds
+
+    def read(self, cache_key: str, response_format: str = "mp3") -> Optional[bytes]:
+        """Return a cached entry's content and mark it as recently used"""
+        if not self.lookup(cache_key, response_format):
+            return None
+        try:
+            with open(self.path(cache_key, response_format), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            self._forget(self.filename(cache_key, response_format))
+            return None
+
+    def put(self, content: bytes, cache_key: str, story_id: Optional[str] = None, response_format: str = "mp3") -> str:
+        """Store content under a cache key and return its URL"""
+        temp_path, digest = self.write_temp(content, cache_key, response_format)
+        return self.commit(temp_path, cache_key, story_id, response_format, digest)
+
+    def write_temp(self, content: bytes, cache_key: str, response_format: str = "mp3") -> Tuple[str, str]:
+        """Write content to a new temporary file, returning its path and content hash
+
+        Touches no shared state, so it can run in a worker thread before commit().
+        """
+        temp_path = self.temp_path(cache_key, response_format)
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        return temp_path, hashlib.sha256(content).hexdigest()
+
+    def commit(
+        self,
+        temp_path: str,
+        cache_key: str,
+        story_id: Optional[str] = None,
+        response_format: str = "mp3",
+        digest: Optional[str] = None
+    ) -> str:
+        """Move a fully written temporary file into the store and return its URL
+
+        Pass the file's hash_file() digest when it is already known, so that
+        committing does not read the file again.
+        """
+        name = self.filename(cache_key, response_format)
+        size = os.path.getsize(temp_path)
+        if digest is None:
+            digest = self.hash_file(temp_path)
+        os.replace(temp_path, os.path.join(self.directory, name))
+
+        if name in self._entries:
+            self.total_bytes -= self._entries[name]["size"]
+        self._entries[name] = {"size": size, "last_access": time.time(), "sha256": digest}
+        self._entries.move_to_end(name)
+        self.total_bytes += size
+
+        if story_id:
+            keys = self._stories.setdefault(story_id, [])
+            if cache_key not in keys:
+                keys.append(cache_key)
+
+        self._evict(keep=name)
+        if time.monotonic() - self._index_saved_at >= self.index_save_interval:
+            self._save_index()
+        return self.url(cache_key, response_format)
+
+    def open_entry(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Path, size and content hash of a stored file for serving, or None
+
+        Serving a file counts as a use for eviction but not as a cache lookup.
+        """
+        entry = self._entries.get(filename)
+        path = os.path.join(self.directory, filename)
+        if entry is None or not os.path.exists(path):
+            return None
+
+        if not entry.get("sha256"):
+            # Adopted from disk at startup without a recorded hash
+            entry["sha256"] = self.hash_file(path)
+        self._touch(filename)
+        return {"path": path, "size": entry["size"], "sha256": entry["sha256"]}
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """SHA-256 of a file's content, read in blocks"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(65536), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _touch(self, name: str) -> None:
+        self._entries[name]["last_access"] = time.time()
+        self._entries.move_to_end(name)
+
+    def _forget(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self.total_bytes -= entry["size"]
+
+        # Stories keep a key as long as any format of it is still stored
+        cache_key = name.rsplit(".", 1)[0]
+        if any(other.startswith(f"{cache_key}.") for other in self._entries):
+            return
+        for story_id in list(self._stories):
+            keys = self._stories[story_id]
+            if cache_key in keys:
+                keys.remove(cache_key)
+                if not keys:
+                    del self._stories[story_id]
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Remove least recently used entries until the store fits its byte budget"""
+        while self.total_bytes > self.max_bytes:
+            victim = next((name for name in self._entries if name != keep), None)
+            if victim is None:
+                break
+            size = self._entries[victim]["size"]
+            try:
+                os.remove(os.path.join(self.directory, victim))
+            except FileNotFoundError:
+                pass
+            self._forget(victim)
+            self.evictions += 1
+            self.evicted_bytes += size
+            logger.info(f"Evicted audio file {victim} ({size} bytes)")
+
+    def _rebuild_index(self) -> None:
+        """Load index.json and reconcile it with the files on disk"""
+        recorded: Dict[str, Any] = {}
+        # Older versions kept the index next to the (publicly served) audio files
+        legacy_index_path = os.path.join(self.directory, INDEX_FILENAME)
+        index_path = self.index_path if os.path.exists(self.index_path) else legacy_index_path
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            recorded = index.get("entries", {})
+            self._stories = index.get("stories", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable audio index {index_path}: {str(e)}")
+
+        # Left over from interrupted writes
+        for entry in os.scandir(self.state_directory):
+            if entry.is_file() and entry.name.endswith(".part"):
+                os.remove(entry.path)
+
+        found = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(".part") or entry.name == INDEX_FILENAME:
+                # Temporary files and the index from older versions must not be served
+                os.remove(entry.path)
+                continue
+            stat = entry.stat()
+            known = recorded.get(entry.name, {})
+            last_access = known.get("last_access", stat.st_mtime)
+            # A recorded hash and duration are only trusted while the size still matches
+            unchanged = known.get("size") == stat.st_size
+            digest = known.get("sha256") if unchanged else None
+            duration = known.get("duration") if unchanged else None
+            found.append((last_access, entry.name, stat.st_size, digest, duration))
+
+        for last_access, name, size, digest, duration in sorted(found, key=lambda item: item[:2]):
+            self._entries[name] = {"size": size, "last_access": last_access, "sha256": digest}
+            if duration is not None:
+                self._entries[name]["duration"] = duration
+            self.total_bytes += size
+
+        # Drop story references to entries that no longer exist
+        present = {name.rsplit(".", 1)[0] for name in self._entries}
+        self._stories = {
+            story_id: [key for key in keys if key in present]
+            for story_id, keys in self._stories.items()
+            if any(key in present for key in keys)
+        }
+
+        self._evict()
+        self._save_index()
+        logger.info(
+            f"Audio store ready: {len(self._entries)} files, {self.total_bytes} bytes "
+            f"(budget {self.max_bytes} bytes)"
+        )
+
+    def _save_index(self) -> None:
+        self._index_saved_at = time.monotonic()
+        temp_path = f"{self.index_path}.{uuid.uuid4().hex}.part"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self._entries, "stories": self._stories}, f)
+            os.replace(temp_path, self.index_path)
+        except Exception as e:
+            logger.warning(f"Failed to save audio index: {str(e)}")
+
+    def flush(self) -> None:
+        """Persist entries and access times recorded since the last write"""
+        self._save_index()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return store statistics for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes
+        }
@@ -0,0 +1,131 @@
+from typing import AsyncIterator, List
+import asyncio
+import hashlib
+import logging
+import os
+import random
+from types import SimpleNamespace
+
+from .gemini_service import GeminiService
+
+logger = logging.getLogger(__name__)
+
+# Sentences used to assemble deterministic stand-in story text
+FAKE_SENTENCES = [
+    "廊下の奥で、誰かが爪で壁を引っかく音がした。",
+    "振り返っても、そこには湿った足跡が残っているだけだった。",
+    "あなたの耳元で、聞き覚えのない声が名前を呼ぶ。",
+    "古い鏡の中のあなたは、ほんの少しだけ遅れて瞬きをした。",
+    "冷たい指先が首筋をなぞり、すぐに消えた。",
+    "錆びた鉄のような匂いが、部屋いっぱいに広がっていく。",
+    "閉めたはずの扉が、音もなく半分だけ開いている。",
+    "天井裏から、何かを引きずるような音が近づいてくる。",
+    "窓の外に立つ人影は、雨に濡れているのに少しも動かない。",
+    "あなたの影だけが、灯りとは反対の方向に伸びていた。",
+    "机の上の人形が、いつの間にかこちらを向いている。",
+    "誰もいないはずの二階から、子供の笑い声が降ってきた。",
+]
+
+FAKE_CHOICES = "\n\n1. 音のする方へ進む\n2. その場から逃げ出す\n3. 息を潜めて様子をうかがう"
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel with configurable latency"""
+
+    def __init__(self, model_name: str, latency_ms: float, latency_sigma: float, stream_chunks: int, seed: int):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.stream_chunks = max(1, stream_chunks)
+        self._rng = random.Random(f"{seed}:{model_name}")
+
+    def _latency(self) -> float:
+        """Sample a log-normally distributed latency in seconds"""
+        if self.latency_ms <= 0:
+            return 0.0
+        return self._rng.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+
+    def _text_for(self, prompt: str) -> str:
+        """Deterministic Japanese text whose length follows the prompt's phase"""
+        digest = hashlib.md5(prompt.encode("utf-8")).hexdigest()
+        rng = random.Random(digest)
+        if "1500-2000文字" in prompt:
+            target, title = 1800, "【湿った足跡】\n\n"
+        elif "400-500文字" in prompt:
+            target, title = 450, ""
+        else:
+            target, title = 300, ""
+
+        sentences: List[str] = []
+        length = 0
+        while length < target:
+            sentence = rng.choice(FAKE_SENTENCES)
+            sentences.append(sentence)
+            length += len(sentence)
+
+        text = title + "".join(sentences)
+        if not title and "選択肢" in prompt:
+            text += FAKE_CHOICES
+        return text
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        text = self._text_for(prompt)
+        latency = self._latency()
+        if not stream:
+            await asyncio.sleep(latency)
+            return FakeResponse(text)
+        return FakeStreamResponse(text, latency, self.stream_chunks)
+
+
+class FakeResponse:
+    """Minimal stand-in for GenerateContentResponse"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=text)]))]
+
+
+class FakeStreamResponse:
+    """Async iterable of FakeResponse chunks spread over the sampled latency"""
+
+    def __init__(self, text: str, latency: float, chunks: int):
+        self.text = text
+        self.latency = latency
+        self.chunks = chunks
+
+    async def __aiter__(self) -> AsyncIterator[FakeResponse]:
+        size = max(1, -(-len(self.text) // self.chunks))
+        pieces = [self.text[i:i + size] for i in range(0, len(self.text), size)]
+        # Roughly a fifth of the latency is spent before the first token
+        await asyncio.sleep(self.latency * 0.2)
+        for piece in pieces:
+            await asyncio.sleep(self.latency * 0.8 / len(pieces))
+            yield FakeResponse(piece)
+
+
+class FakeGeminiService(GeminiService):
+    """GeminiService backed by FakeGenerativeModel, for offline benchmarking
+
+    Latency is configured with FAKE_GEMINI_LATENCY_MS (median) and
+    FAKE_GEMINI_LATENCY_SIGMA (log-normal spread); streamed replies are split
+    into FAKE_GEMINI_STREAM_CHUNKS chunks.
+    """
+
+    def _configure_client(self) -> None:
+        self.fake_latency_ms = float(os.getenv("FAKE_GEMINI_LATENCY_MS", "3000"))
+        self.fake_latency_sigma = float(os.getenv("FAKE_GEMINI_LATENCY_SIGMA", "0.5"))
+        self.fake_stream_chunks = int(os.getenv("FAKE_GEMINI_STREAM_CHUNKS", "20"))
+        self.fake_seed = int(os.getenv("FAKE_GEMINI_SEED", "0"))
+        logger.warning(
+            f"Using fake Gemini backend (median latency {self.fake_latency_ms:.0f} ms, "
+            f"sigma {self.fake_latency_sigma})"
+        )
+
+    def _create_model(self, model_name: str) -> FakeGenerativeModel:
+        return FakeGenerativeModel(
+            model_name,
+            self.fake_latency_ms,
+            self.fake_latency_sigma,
+            self.fake_stream_chunks,
+            self.fake_seed
+        )
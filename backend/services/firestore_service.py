@@ -1,5 +1,7 @@
 from google.cloud import firestore
-from typing import Dict, Any, Optional
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import os
 import logging
 
@@ -87,6 +89,80 @@ class FirestoreService:
             logger.warning("Continuing without Firestore for development purposes")
             return
 
+    async def update_story_fields(self, story_id: str, fields: Dict[Tuple[str, ...], Any]) -> None:
+        """Update individual nested fields of a story document
+        
+        Keys are field paths given as tuples of map keys, so concurrent writers
+        touching different entries of the same map do not overwrite each other.
+        """
+        if self.db is None:
+            logger.warning(f"Firestore not available, skipping story update: {story_id}")
+            return
+            
+        try:
+            doc_ref = self.stories_collection.document(story_id)
+            doc_ref.update({FieldPath(*path).to_api_repr(): value for path, value in fields.items()})
+            logger.info(f"Updated {len(fields)} fields of story with ID: {story_id}")
+        except Exception as e:
+            logger.error(f"Error updating story fields: {str(e)}")
+            # For development, don't fail
+            logger.warning("Continuing without Firestore for development purposes")
+            return
+
+    async def acquire_lease(self, story_id: str, operation: str, owner: str, ttl_seconds: int) -> bool:
+        """Claim an exclusive, expiring lease on a story operation across instances"""
+        if self.db is None:
+            logger.warning(f"Firestore not available, granting lease locally: {story_id}/{operation}")
+            return True
+            
+        doc_ref = self.stories_collection.document(story_id)
+        now = datetime.now(timezone.utc)
+        
+        @firestore.transactional
+        def claim(transaction) -> bool:
+            snapshot = doc_ref.get(transaction=transaction)
+            leases = (snapshot.to_dict() or {}).get("leases") or {}
+            current = leases.get(operation)
+            if current and current.get("owner") != owner and current.get("expiresAt") and current["expiresAt"] > now:
+                return False
+            # Operation names may contain dots (e.g. a speed), so quote the field path
+            transaction.update(doc_ref, {
+                FieldPath("leases", operation).to_api_repr(): {
+                    "owner": owner,
+                    "expiresAt": now + timedelta(seconds=ttl_seconds)
+                }
+            })
+            return True
+        
+        try:
+            acquired = claim(self.db.transaction())
+            logger.info(f"Lease {story_id}/{operation} {'acquired' if acquired else 'held elsewhere'}")
+            return acquired
+        except Exception as e:
+            logger.error(f"Error acquiring lease: {str(e)}")
+            # For development, don't block the operation
+            logger.warning("Granting lease for development purposes")
+            return True
+
+    async def release_lease(self, story_id: str, operation: str, owner: str) -> None:
+        """Release a lease previously acquired by this owner"""
+        if self.db is None:
+            return
+            
+        doc_ref = self.stories_collection.document(story_id)
+        
+        @firestore.transactional
+        def release(transaction) -> None:
+            snapshot = doc_ref.get(transaction=transaction)
+            leases = (snapshot.to_dict() or {}).get("leases") or {}
+            if (leases.get(operation) or {}).get("owner") == owner:
+                transaction.update(doc_ref, {FieldPath("leases", operation).to_api_repr(): firestore.DELETE_FIELD})
+        
+        try:
+            release(self.db.transaction())
+        except Exception as e:
+            logger.error(f"Error releasing lease: {str(e)}")
+
     async def is_email_used(self, email: str) -> bool:
         """Check if an email address has already been used"""
         if self.db is None:
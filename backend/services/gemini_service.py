@@ -1,36 +1,51 @@
 import google.generativeai as genai
-from typing import Dict, List, Any
+from collections import deque
+from typing import Dict, List, Any, AsyncIterator, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import os
+import time
 import logging
 
+from .personality_profile import build_personality_prompt, get_cache_stats
+from .story_context import StoryContext, StoryContextCache, estimate_tokens
+from .model_router import ModelRouter
+
 logger = logging.getLogger(__name__)
 
 class GeminiService:
     def __init__(self):
-        # Initialize Gemini API
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is required")
+        # Limit concurrent Gemini calls per worker; extra callers wait in the queue
+        self.max_in_flight = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "32"))
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._in_flight = 0
+        self._queued = 0
+        self._completed = 0
+        self._failed = 0
         
-        genai.configure(api_key=api_key)
+        # Rendered conversation per story, extended incrementally each turn
+        self.context_cache = StoryContextCache(int(os.getenv("GEMINI_CONTEXT_CACHE_SIZE", "1000")))
+
+        # Initialize Gemini API
+        self._configure_client()
         
-        # Try different model names in order of preference
+        # Models in order of preference (comma-separated GEMINI_MODELS overrides)
         model_names = [
-            'gemini-2.5-flash-lite-preview-06-17',
-            'gemini-2.5-flash'
+            name.strip()
+            for name in os.getenv("GEMINI_MODELS", "gemini-2.5-flash-lite-preview-06-17,gemini-2.5-flash").split(",")
+            if name.strip()
         ]
         
-        self.model = None
+        self.models = {}
         for model_name in model_names:
             try:
-                self.model = genai.GenerativeModel(model_name)
+                self.models[model_name] = self._create_model(model_name)
                 logger.info(f"Successfully initialized Gemini model: {model_name}")
-                break
             except Exception as e:
                 logger.warning(f"Failed to initialize model {model_name}: {str(e)}")
                 continue
         
-        if self.model is None:
+        if not self.models:
             # List available models for debugging
             try:
                 available_models = [m.name for m in genai.list_models()]
@@ -39,99 +54,273 @@ class GeminiService:
                 logger.error(f"Failed to list available models: {str(e)}")
             
             raise ValueError("Failed to initialize any Gemini model. Please check your API key and available models.")
+        
+        # Per-phase routing by rolling latency, with a circuit breaker per model
+        self.router = ModelRouter(
+            list(self.models.keys()),
+            failure_rate=float(os.getenv("GEMINI_CIRCUIT_FAILURE_RATE", "0.5")),
+            cooldown_seconds=float(os.getenv("GEMINI_CIRCUIT_COOLDOWN", "30"))
+        )
+        
+        # Opt-in hedging: fire a backup request when a call outlives recent latency
+        self.hedge_enabled = os.getenv("GEMINI_HEDGE_ENABLED", "false").lower() == "true"
+        self.hedge_percentile = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "95"))
+        self.hedge_min_samples = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", "10"))
+        # At most this fraction of recent hedge-eligible calls may fire a backup,
+        # so a latency spike under load does not double the request rate
+        self.hedge_budget = float(os.getenv("GEMINI_HEDGE_BUDGET", "0.1"))
+        self._hedge_history = deque(maxlen=int(os.getenv("GEMINI_HEDGE_WINDOW", "100")))
+        self._hedges_fired = 0
+        self._hedges_over_budget = 0
+        self._hedges_no_slot = 0
+        self._hedge_wins = 0
+        self._hedge_primary_wins = 0
 
-    def _create_personality_prompt(self, quiz_answers: Dict[str, str]) -> str:
-        """Create a personality prompt based on quiz answers"""
+    def _configure_client(self) -> None:
+        """Configure the Gemini API client"""
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
         
-        # Create a mapping of answers to story preferences
-        preferences = {
-            'q1': {
-                'a': '閉鎖された古い洋館や病院などの不気味な建物',
-                'b': '日常に潜む歪みや違和感',
-                'c': '未知の生物が潜む自然環境'
-            },
-            'q2': {
-                'a': 'じわじわと精神を追い詰める心理的恐怖',
-                'b': '目に見える怪物や幽霊からの直接的な恐怖',
-                'c': '理解不能な超常現象や不条理な恐怖'
-            },
-            'q3': {
-                'a': 'ごく普通の一般人で、恐怖に翻弄される主人公',
-                'b': '恐怖の謎を解き明かそうとする探究心のある主人公',
-                'c': '特殊な能力で恐怖に立ち向かう強い主人公'
-            },
-            'q4': {
-                'a': '不気味な音を立てる古い人形',
-                'b': '持つ者の運命を狂わせる曰く付きの鏡',
-                'c': '謎の文字が書かれた古文書'
-            },
-            'q5': {
-                'a': '過去の悲劇や怨念',
-                'b': '科学では説明できない呪い',
-                'c': '人間の狂気や悪意'
-            },
-            'q6': {
-                'a': 'ゆっくりと静かに恐怖が忍び寄るスローペース',
-                'b': '次々と事件が起こるジェットコースター展開',
-                'c': '静と動が巧みに切り替わる緩急のある展開'
-            },
-            'q7': {
-                'a': '何かを知っているようで話さない謎めいた老人',
-                'b': '主人公を惑わす美しいが影のある人物',
-                'c': '純粋無垢だが、時折不気味な言動を見せる子供'
-            },
-            'q8': {
-                'a': '耳元で聞こえるはずのない囁き声（聴覚的恐怖）',
-                'b': '誰もいないはずなのに感じる視線（視覚的恐怖）',
-                'c': 'べっとりと肌にまとわりつくような嫌な感触（触覚的恐怖）'
-            },
-            'q9': {
-                'a': '主人公が絶望に叩き落とされるバッドエンド',
-                'b': '謎は残るが、日常には戻れるビターエンド',
-                'c': '恐怖の元凶を断ち切る希望のあるハッピーエンド'
-            },
-            'q10': {
-                'a': '読者に情け容赦なく、徹底的に恐怖を与える語り手',
-                'b': '読者を物語に引き込み、謎解きを促すガイド役',
-                'c': '時にユーモアを交えながらも、核心ではゾッとさせる語り手'
-            }
-        }
+        genai.configure(api_key=api_key)
+
+    def _create_model(self, model_name: str):
+        """Create a client for one Gemini model"""
+        return genai.GenerativeModel(model_name)
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Hold one of max_in_flight request slots, queueing if none is free"""
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+        
+        self._in_flight += 1
+        try:
+            yield
+            self._completed += 1
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    async def _try_hedge_slot(self) -> bool:
+        """Take a request slot for a hedge without waiting; False if none is free"""
+        if self._semaphore.locked():
+            return False
+        # Acquiring an unlocked semaphore completes without suspending
+        await self._semaphore.acquire()
+        self._in_flight += 1
+        return True
+
+    def _release_hedge_slot(self) -> None:
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    def _within_hedge_budget(self) -> bool:
+        """Whether recent calls leave room for another hedge"""
+        window = max(len(self._hedge_history), 1)
+        return sum(self._hedge_history) < self.hedge_budget * window
+
+    async def _call_model(self, model_name: str, prompt: str, phase: str) -> str:
+        """Send one request to a specific model and record the outcome for routing"""
+        start = time.monotonic()
+        try:
+            response = await self.models[model_name].generate_content_async(prompt)
+            text = response.text.strip()
+        except asyncio.CancelledError:
+            # A cancelled hedge loser was at least this slow
+            self.router.record_abandoned(model_name, phase, time.monotonic() - start)
+            raise
+        except Exception:
+            self.router.record_failure(model_name, phase)
+            raise
         
-        # Advanced personalization algorithm
-        horror_profile = self._analyze_horror_profile(quiz_answers)
-        story_elements = self._generate_story_elements(quiz_answers)
-        narrative_style = self._determine_narrative_style(quiz_answers)
+        self.router.record_success(model_name, phase, time.monotonic() - start)
         
-        # Build personality description with weights
-        personality_traits = []
-        for q_id, answer in quiz_answers.items():
-            if q_id in preferences and answer in preferences[q_id]:
-                personality_traits.append(preferences[q_id][answer])
+        # Newer SDK versions report exact token usage
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            logger.info(f"Gemini usage: prompt_tokens={usage.prompt_token_count}, output_tokens={usage.candidates_token_count}")
         
-        # Create comprehensive personality prompt
-        prompt_parts = [
-            f"【ユーザーホラープロファイル】",
-            f"恐怖タイプ: {horror_profile['horror_type']}",
-            f"結末好み: {horror_profile['ending_preference']}",
-            f"恐怖強度: {horror_profile['intensity_level']}",
-            "",
-            f"【物語要素指定】",
-            f"舞台: {story_elements['setting']}",
-            f"恐怖の源: {story_elements['fear_source']}",
-            f"五感刺激: {story_elements['sensory_focus']}",
-            f"ペース: {story_elements['pacing']}",
-            "",
-            f"【語りスタイル】",
-            f"{narrative_style}",
-            "",
-            f"【ユーザー回答詳細】"
-        ]
+        return text
+
+    def _hedge_delay(self, model_name: str, phase: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging does not apply"""
+        if not self.hedge_enabled or self.router.sample_count(model_name, phase) < self.hedge_min_samples:
+            return None
+        return self.router.latency_percentile(model_name, phase, self.hedge_percentile)
+
+    async def _call_with_hedge(self, model_name: str, prompt: str, phase: str) -> str:
+        """Call a model, racing a backup request if it runs past the hedge delay"""
+        delay = self._hedge_delay(model_name, phase)
+        if delay is None:
+            return await self._call_model(model_name, prompt, phase)
         
-        # Add traditional traits
-        for trait in personality_traits:
-            prompt_parts.append(f"- {trait}")
+        primary = asyncio.ensure_future(self._call_model(model_name, prompt, phase))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                self._hedge_history.append(False)
+                return primary.result()
+            
+            if not self._within_hedge_budget():
+                self._hedges_over_budget += 1
+                self._hedge_history.append(False)
+                return await primary
+            
+            # Backups count against max_in_flight like any other request
+            if not await self._try_hedge_slot():
+                self._hedges_no_slot += 1
+                self._hedge_history.append(False)
+                return await primary
+            
+            # The next best healthy model, or the same model if it is the only healthy one
+            backup_name = self.router.choose_available(phase, exclude=[model_name])
+            if backup_name is None and self.router.is_closed(model_name):
+                backup_name = model_name
+            if backup_name is None:
+                # A half-open trial or fail-open request gets no second copy
+                self._release_hedge_slot()
+                self._hedge_history.append(False)
+                return await primary
+            
+            self._hedge_history.append(True)
+            self._hedges_fired += 1
+            logger.info(f"Hedging {phase} request on {model_name} after {delay:.2f}s with {backup_name}")
+            backup = asyncio.ensure_future(self._call_model(backup_name, prompt, phase))
+            # Released when the backup ends, even if it is cancelled before it starts
+            backup.add_done_callback(lambda _: self._release_hedge_slot())
+            tasks.append(backup)
+            
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._hedge_wins += 1
+                        else:
+                            self._hedge_primary_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Cancel whichever request lost the race
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _generate_content(self, prompt: str, phase: str) -> str:
+        """Run a Gemini request on the routed model, failing over to the others on error"""
+        async with self._slot():
+            tried = []
+            while True:
+                model_name = self.router.choose(phase, exclude=tried)
+                tried.append(model_name)
+                try:
+                    return await self._call_with_hedge(model_name, prompt, phase)
+                except Exception as e:
+                    if len(tried) >= len(self.models):
+                        raise
+                    logger.warning(f"Gemini model {model_name} failed during {phase}, failing over: {str(e)}")
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """Join the text parts of a streamed chunk
         
-        return "\n".join(prompt_parts)
+        chunk.text raises for chunks that are not a single text part, such as
+        the finish-only or safety-blocked chunk at the end of a stream.
+        """
+        if not chunk.candidates:
+            return ""
+        return "".join(part.text for part in chunk.candidates[0].content.parts if part.text)
+
+    async def _stream_content(self, prompt: str, phase: str) -> AsyncIterator[str]:
+        """Stream a Gemini response chunk by chunk, holding a slot until the stream ends"""
+        async with self._slot():
+            tried = []
+            while True:
+                model_name = self.router.choose(phase, exclude=tried)
+                tried.append(model_name)
+                start = time.monotonic()
+                started = False
+                try:
+                    response = await self.models[model_name].generate_content_async(prompt, stream=True)
+                    async for chunk in response:
+                        text = self._chunk_text(chunk)
+                        if text:
+                            started = True
+                            yield text
+                except Exception as e:
+                    self.router.record_failure(model_name, phase)
+                    # Text already sent to the client cannot be retracted, so only fail over before the first chunk
+                    if started or len(tried) >= len(self.models):
+                        raise
+                    logger.warning(f"Gemini model {model_name} failed during {phase}, failing over: {str(e)}")
+                    continue
+                except BaseException:
+                    # The client went away (GeneratorExit or cancellation); release a half-open trial
+                    self.router.record_abandoned(model_name, phase, time.monotonic() - start)
+                    raise
+                
+                self.router.record_success(model_name, phase, time.monotonic() - start)
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return concurrency statistics for monitoring"""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queue_depth": self._queued,
+            "completed": self._completed,
+            "failed": self._failed,
+            "profile_cache": get_cache_stats(),
+            "context_cache": self.context_cache.get_stats(),
+            "routing": self.router.snapshot(),
+            "hedging": {
+                "enabled": self.hedge_enabled,
+                "percentile": self.hedge_percentile,
+                "budget": self.hedge_budget,
+                "fired": self._hedges_fired,
+                "skipped_over_budget": self._hedges_over_budget,
+                "skipped_no_slot": self._hedges_no_slot,
+                "backup_wins": self._hedge_wins,
+                "primary_wins": self._hedge_primary_wins,
+                "hedge_rate": round(self._hedges_fired / self._completed, 3) if self._completed else 0.0
+            }
+        }
+
+    def _create_personality_prompt(self, quiz_answers: Dict[str, str]) -> str:
+        """Create a personality prompt based on quiz answers"""
+        return build_personality_prompt(quiz_answers)
+
+    def _get_story_context(self, story_id: Optional[str], chat_history: List[Dict[str, str]]) -> StoryContext:
+        """Return the story's rendered conversation, appending only new messages"""
+        context = self.context_cache.get(story_id) if story_id else StoryContext()
+        context.sync(chat_history)
+        return context
+
+    def _log_prompt_usage(self, story_id: Optional[str], label: str, prompt: str, context: StoryContext) -> None:
+        """Log prompt size per turn and how much of it was newly rendered
+        
+        Only rendering is incremental: every prompt still sends the whole
+        conversation so far, so its size keeps growing with each turn.
+        """
+        previous = context.last_prompt_chars.get(label)
+        growth = len(prompt) - previous if previous else len(prompt)
+        context.last_prompt_chars[label] = len(prompt)
+        logger.info(
+            f"Gemini {label} prompt for story {story_id}: {len(prompt)} chars "
+            f"(~{estimate_tokens(prompt)} tokens) including all previous turns, "
+            f"{context.added_messages} new messages rendered, +{growth} chars since previous {label} prompt"
+        )
 
     async def generate_initial_story(self, quiz_answers: Dict[str, str]) -> str:
         """Generate the initial story based on quiz answers"""
@@ -167,49 +356,44 @@ class GeminiService:
 短編ホラーの冒頭（起）を生成してください:
 """
             
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return await self._generate_content(prompt, "opening")
             
         except Exception as e:
             logger.error(f"Error generating initial story: {str(e)}")
             raise
 
-    async def generate_response(self, quiz_answers: Dict[str, str], chat_history: List[Dict[str, str]]) -> str:
-        """Generate AI response based on chat history"""
-        try:
-            personality = self._create_personality_prompt(quiz_answers)
-            
-            # Build conversation context
-            conversation = ""
-            for msg in chat_history:
-                role = "語り部" if msg["role"] == "model" else "あなた"
-                conversation += f"{role}: {msg['content']}\n\n"
-            
-            # Count turns to determine story structure (0-indexed)
-            user_turns = len([msg for msg in chat_history if msg["role"] == "user"])
-            
-            # Determine story phase for 4-turn structure
-            if user_turns == 1:
-                story_phase = "承"
-                phase_instruction = "【承】恐怖の展開と状況の悪化。不安を増大させ、読者をさらに深く恐怖の世界に引き込んでください。"
-            elif user_turns == 2:
-                story_phase = "承"
-                phase_instruction = "【承】恐怖の展開と状況の悪化。不安を増大させ、読者をさらに深く恐怖の世界に引き込んでください。"
-            elif user_turns == 3:
-                story_phase = "転"
-                phase_instruction = "【転】恐怖がさらに高まり、真実に近づく。読者を恐怖のクライマックスへと導いてください。"
-            elif user_turns == 4:
-                story_phase = "結"
-                phase_instruction = "【結】物語の完結。恐怖の結末を迎え、ユーザーの好みに応じた強烈なインパクトで終わらせてください。"
-            else:
-                story_phase = "承"
-                phase_instruction = "【承】恐怖の展開と状況の悪化。"
-                
-            is_pre_final_turn = user_turns == 3
-            is_final_turn = user_turns == 4
-            
+    def _create_response_prompt(self, quiz_answers: Dict[str, str], context: StoryContext) -> str:
+        """Build the continuation prompt for the current chat turn"""
+        personality = self._create_personality_prompt(quiz_answers)
+        
+        # Conversation context is rendered incrementally by StoryContext
+        conversation = context.chat_transcript
+        
+        # Count turns to determine story structure (0-indexed)
+        user_turns = context.user_turns
+        
+        # Determine story phase for 4-turn structure
+        if user_turns == 1:
+            story_phase = "承"
+            phase_instruction = "【承】恐怖の展開と状況の悪化。不安を増大させ、読者をさらに深く恐怖の世界に引き込んでください。"
+        elif user_turns == 2:
+            story_phase = "承"
+            phase_instruction = "【承】恐怖の展開と状況の悪化。不安を増大させ、読者をさらに深く恐怖の世界に引き込んでください。"
+        elif user_turns == 3:
+            story_phase = "転"
+            phase_instruction = "【転】恐怖がさらに高まり、真実に近づく。読者を恐怖のクライマックスへと導いてください。"
+        elif user_turns == 4:
+            story_phase = "結"
+            phase_instruction = "【結】物語の完結。恐怖の結末を迎え、ユーザーの好みに応じた強烈なインパクトで終わらせてください。"
+        else:
+            story_phase = "承"
+            phase_instruction = "【承】恐怖の展開と状況の悪化。"
             
-            prompt = f"""
+        is_pre_final_turn = user_turns == 3
+        is_final_turn = user_turns == 4
+        
+        
+        prompt = f"""
 あなたは恐怖小説の専門的な語り部です。以下のユーザーの好みに基づいて、5ターン完結の短編ホラー小説を続けてください。
 
 ユーザーの好み:
@@ -241,24 +425,57 @@ class GeminiService:
 
 短編ホラーの続きを生成してください:
 """
-            
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+        
+        return prompt
+
+    async def generate_response(
+        self,
+        quiz_answers: Dict[str, str],
+        chat_history: List[Dict[str, str]],
+        story_id: Optional[str] = None
+    ) -> str:
+        """Generate AI response based on chat history"""
+        try:
+            context = self._get_story_context(story_id, chat_history)
+            prompt = self._create_response_prompt(quiz_answers, context)
+            self._log_prompt_usage(story_id, "continuation", prompt, context)
+            return await self._generate_content(prompt, "continuation")
             
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             raise
 
-    async def generate_final_story(self, quiz_answers: Dict[str, str], chat_history: List[Dict[str, str]]) -> str:
+    async def stream_response(
+        self,
+        quiz_answers: Dict[str, str],
+        chat_history: List[Dict[str, str]],
+        story_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Generate AI response based on chat history, yielding text as it arrives"""
+        try:
+            context = self._get_story_context(story_id, chat_history)
+            prompt = self._create_response_prompt(quiz_answers, context)
+            self._log_prompt_usage(story_id, "continuation", prompt, context)
+            async for text in self._stream_content(prompt, "continuation"):
+                yield text
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            raise
+
+    async def generate_final_story(
+        self,
+        quiz_answers: Dict[str, str],
+        chat_history: List[Dict[str, str]],
+        story_id: Optional[str] = None
+    ) -> str:
         """Generate the final polished story for PDF"""
         try:
             personality = self._create_personality_prompt(quiz_answers)
             
-            # Build conversation context
-            conversation = ""
-            for msg in chat_history:
-                role = "語り部" if msg["role"] == "model" else "あなたの行動"
-                conversation += f"【{role}】\n{msg['content']}\n\n"
+            # Conversation context is rendered incrementally by StoryContext
+            context = self._get_story_context(story_id, chat_history)
+            conversation = context.final_transcript
             
             prompt = f"""
 あなたは恐怖小説の専門編集者です。以下のインタラクティブな対話を、完成された短編ホラー小説に仕上げてください。
@@ -283,97 +500,9 @@ class GeminiService:
 完成された小説を生成してください:
 """
             
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            self._log_prompt_usage(story_id, "final", prompt, context)
+            return await self._generate_content(prompt, "final")
             
         except Exception as e:
             logger.error(f"Error generating final story: {str(e)}")
             raise
-    
-    def _analyze_horror_profile(self, quiz_answers: Dict[str, str]) -> Dict[str, str]:
-        """Analyze user's horror preferences and create profile"""
-        
-        # Horror type analysis (q2)
-        horror_types = {
-            'a': '心理的恐怖主体 - 精神をじわじわといたぶる、内面から湧き上がる恐怖',
-            'b': '直接的恐怖主体 - 目に見える脇威、即座的な危険とショック',
-            'c': '超常恐怖主体 - 理解できない不条理、存在そのものへの恐怖'
-        }
-        
-        # Ending preference analysis (q9)
-        ending_prefs = {
-            'a': '絶望的結末希望 - 主人公が打ちのめされる強烈なバッドエンド',
-            'b': '曖昧的結末希望 - 謎が残り、不安が残るビターエンド',
-            'c': '希望的結末希望 - 恐怖を乗り越えるハッピーエンド'
-        }
-        
-        # Intensity level (combination of q2, q6, q10)
-        q2_ans = quiz_answers.get('q2', 'a')
-        q6_ans = quiz_answers.get('q6', 'a') 
-        q9_ans = quiz_answers.get('q9', 'a')
-        q10_ans = quiz_answers.get('q10', 'a')
-        
-        # Determine intensity based on answers
-        if q2_ans == 'a' and q10_ans == 'a':
-            intensity = 'MAX強度 - 容赦なく、最大限の恐怖を与える'
-        elif q2_ans == 'b' and q6_ans == 'b':
-            intensity = 'HIGH強度 - アクション重視で強烈な恐怖を与える'
-        elif q2_ans == 'c':
-            intensity = 'MIND強度 - 理解不能な不条理で精神を攻める'
-        else:
-            intensity = 'MID強度 - バランスの取れた恐怖体験を提供'
-        
-        return {
-            'horror_type': horror_types.get(q2_ans, horror_types['a']),
-            'ending_preference': ending_prefs.get(q9_ans, ending_prefs['b']),
-            'intensity_level': intensity
-        }
-    
-    def _generate_story_elements(self, quiz_answers: Dict[str, str]) -> Dict[str, str]:
-        """Generate specific story elements based on quiz answers"""
-        
-        # Setting elements (q1)
-        settings = {
-            'a': '閉鎖空間系 - 古い建物、地下室、逃げ場のない狭い空間',
-            'b': '日常侵食系 - いつもの場所に潜む違和感、家、学校、職場',
-            'c': '自然環境系 - 森、山、湖、人里離れた場所での孤立感'
-        }
-        
-        # Fear source (q5)
-        fear_sources = {
-            'a': '怨念系 - 過去の悲劇、死者の意思、歴史の闇',
-            'b': '呪い系 - 超自然的な力、不可解な現象、神秘的要素',
-            'c': '狂気系 - 人間の悪意、異常な行動、社会の闇'
-        }
-        
-        # Sensory focus (q8)
-        sensory_elements = {
-            'a': '聴覚中心 - 怪音、囁き声、不気味な静寂で恐怖を編み出す',
-            'b': '視覚中心 - 影、動き、視線、見えてはいけないもので恐怖を作る',
-            'c': '触覚中心 - 不快な感触、温度変化、肩に最く気配で恐怖を喩起'
-        }
-        
-        # Pacing (q6)
-        pacing_styles = {
-            'a': 'スロービルド - じっくりと不安を積み重ね、緊張感を持続',
-            'b': 'ラピッド展開 - 次々と起こる事件、スピーディな展開',
-            'c': '緩急自在 - 静と動の切り替え、リズムのある展開'
-        }
-        
-        return {
-            'setting': settings.get(quiz_answers.get('q1', 'a'), settings['a']),
-            'fear_source': fear_sources.get(quiz_answers.get('q5', 'a'), fear_sources['a']),
-            'sensory_focus': sensory_elements.get(quiz_answers.get('q8', 'a'), sensory_elements['a']),
-            'pacing': pacing_styles.get(quiz_answers.get('q6', 'a'), pacing_styles['a'])
-        }
-    
-    def _determine_narrative_style(self, quiz_answers: Dict[str, str]) -> str:
-        """Determine narrative style based on q10 answer"""
-        
-        styles = {
-            'a': '「容赦なき語り手」 - 読者を突き放し、情け無用の恐怖を叩き込む。直接的で強烈な描写を使い、読者の精神を追い詰める。',
-            'b': '「ガイド型語り手」 - 読者を物語に引き込み、謎解きへと導く。教育的でありながら、恐怖の真相を明かしていく。',
-            'c': '「ユーモア混在語り手」 - 時に軽妙なユーモアを散りばめながら、油断させた隠で真の恐怖を仕掛ける。'
-        }
-        
-        return styles.get(quiz_answers.get('q10', 'b'), styles['b'])
\ No newline at end of file
@@ -0,0 +1,187 @@
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def percentile(samples: Iterable[float], pct: float) -> Optional[float]:
+    """Return the pct-th percentile (0-100) of the samples, or None if empty"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class ModelHealth:
+    """Rolling latency, error rate and circuit state for one model"""
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.window = window
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def phase_latencies(self, phase: str) -> Deque[float]:
+        if phase not in self.latencies:
+            self.latencies[phase] = deque(maxlen=self.window)
+        return self.latencies[phase]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class ModelRouter:
+    """Route each story phase to the fastest healthy Gemini model"""
+
+    def __init__(
+        self,
+        model_names: List[str],
+        window: int = 50,
+        failure_rate: float = 0.5,
+        min_requests: int = 5,
+        consecutive_failures: int = 3,
+        cooldown_seconds: float = 30.0,
+        warmup_samples: int = 3,
+        explore_rate: float = 0.05
+    ):
+        self.model_names = list(model_names)
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.consecutive_failures = consecutive_failures
+        self.cooldown_seconds = cooldown_seconds
+        self.warmup_samples = warmup_samples
+        self.explore_rate = explore_rate
+        self.health = {name: ModelHealth(name, window) for name in self.model_names}
+
+    def _available(self, health: ModelHealth) -> bool:
+        """Whether a model may receive a request right now"""
+        if health.state == CLOSED:
+            return True
+        if health.state == OPEN and time.monotonic() - health.opened_at >= self.cooldown_seconds:
+            health.state = HALF_OPEN
+            logger.info(f"Circuit for {health.name} half-open, allowing a trial request")
+        # Half-open circuits let exactly one trial request through
+        return health.state == HALF_OPEN and not health.trial_in_flight
+
+    def _pick(self, phase: str, candidates: List[ModelHealth]) -> ModelHealth:
+        """Lowest median latency among candidates, after warm-up and with occasional exploration"""
+        least_sampled = min(candidates, key=lambda h: len(h.phase_latencies(phase)))
+        if len(least_sampled.phase_latencies(phase)) < self.warmup_samples:
+            # Collect a few samples from every model before comparing them
+            return least_sampled
+        if len(candidates) > 1 and random.random() < self.explore_rate:
+            # Occasionally refresh the statistics of a non-preferred model
+            return random.choice(candidates)
+        return min(candidates, key=lambda h: percentile(h.phase_latencies(phase), 50))
+
+    def choose(self, phase: str, exclude: Iterable[str] = ()) -> str:
+        """Pick the model for a phase: lowest median latency among healthy models"""
+        excluded = set(exclude)
+        candidates = [h for name, h in self.health.items() if name not in excluded and self._available(h)]
+
+        if not candidates:
+            # Every circuit is open: fail open on the model that has rested longest
+            resting = [h for name, h in self.health.items() if name not in excluded] or list(self.health.values())
+            chosen = min(resting, key=lambda h: h.opened_at)
+        else:
+            chosen = self._pick(phase, candidates)
+
+        if chosen.state == HALF_OPEN:
+            chosen.trial_in_flight = True
+        return chosen.name
+
+    def choose_available(self, phase: str, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Like choose, but never fails open: None when no other model may take a request"""
+        excluded = set(exclude)
+        candidates = [h for name, h in self.health.items() if name not in excluded and self._available(h)]
+        if not candidates:
+            return None
+
+        chosen = self._pick(phase, candidates)
+        if chosen.state == HALF_OPEN:
+            chosen.trial_in_flight = True
+        return chosen.name
+
+    def is_closed(self, model_name: str) -> bool:
+        """Whether a model's circuit is closed, so it may take extra requests"""
+        return self.health[model_name].state == CLOSED
+
+    def record_success(self, model_name: str, phase: str, latency: float) -> None:
+        health = self.health[model_name]
+        health.phase_latencies(phase).append(latency)
+        health.outcomes.append(True)
+        health.consecutive_failures = 0
+        if health.state != CLOSED:
+            logger.info(f"Circuit for {model_name} closed after successful trial")
+            health.state = CLOSED
+            health.trial_in_flight = False
+            health.outcomes.clear()
+            health.outcomes.append(True)
+
+    def record_failure(self, model_name: str, phase: str) -> None:
+        health = self.health[model_name]
+        health.outcomes.append(False)
+        health.consecutive_failures += 1
+
+        tripped = (
+            health.state == HALF_OPEN
+            or health.consecutive_failures >= self.consecutive_failures
+            or (len(health.outcomes) >= self.min_requests and health.error_rate() >= self.failure_rate)
+        )
+        if tripped and health.state != OPEN:
+            logger.warning(
+                f"Circuit for {model_name} opened (phase={phase}, error_rate={health.error_rate():.2f}, "
+                f"consecutive_failures={health.consecutive_failures})"
+            )
+            health.state = OPEN
+            health.opened_at = time.monotonic()
+        health.trial_in_flight = False
+
+    def record_abandoned(self, model_name: str, phase: str, elapsed: float) -> None:
+        """Record a cancelled request; its elapsed time is a lower bound on latency"""
+        health = self.health[model_name]
+        health.phase_latencies(phase).append(elapsed)
+        health.trial_in_flight = False
+
+    def sample_count(self, model_name: str, phase: str) -> int:
+        """Number of latency samples held for a model and phase"""
+        return len(self.health[model_name].phase_latencies(phase))
+
+    def latency_percentile(self, model_name: str, phase: str, pct: float) -> Optional[float]:
+        """Recent latency percentile for a model and phase, in seconds"""
+        return percentile(self.health[model_name].phase_latencies(phase), pct)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the routing state for monitoring"""
+        models = {}
+        for name, health in self.health.items():
+            models[name] = {
+                "state": health.state,
+                "error_rate": round(health.error_rate(), 3),
+                "requests": len(health.outcomes),
+                "consecutive_failures": health.consecutive_failures,
+                "latency": {
+                    phase: {
+                        "samples": len(samples),
+                        "p50": percentile(samples, 50),
+                        "p95": percentile(samples, 95)
+                    }
+                    for phase, samples in health.latencies.items()
+                }
+            }
+        return {"models": models}
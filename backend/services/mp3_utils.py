@@ -0,0 +1,198 @@
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bitrates in kbps indexed by [MPEG-1?][layer][bitrate index]
+BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+
+# Sample rates in Hz indexed by version bits (0: MPEG-2.5, 2: MPEG-2, 3: MPEG-1)
+SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+# Samples per frame indexed by [MPEG-1?][layer]
+SAMPLES_PER_FRAME = {
+    True: {1: 384, 2: 1152, 3: 1152},
+    False: {1: 384, 2: 1152, 3: 576},
+}
+
+ID3V1_SIZE = 128
+
+
+def _id3v2_size(data: bytes) -> int:
+    """Length of a leading ID3v2 tag (header, body and footer), or 0"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # Tag size is a 28-bit "syncsafe" integer: 7 bits per byte
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def parse_frame_header(data: bytes, offset: int) -> Optional[Tuple[int, bool, int]]:
+    """Parse the MPEG audio frame header at offset
+
+    Returns (frame length, is MPEG-1, channel mode), or None if the bytes
+    there are not a valid header.
+    """
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    layer = 4 - layer_bits
+    bitrate = BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+
+    if layer == 1:
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and not mpeg1:
+        length = 72 * bitrate // sample_rate + padding
+    else:
+        length = 144 * bitrate // sample_rate + padding
+    return length, mpeg1, (b3 >> 6) & 0x03
+
+
+def _is_info_frame(frame: bytes, mpeg1: bool, channel_mode: int) -> bool:
+    """Whether a frame is a silent Xing/Info/VBRI header describing the whole file"""
+    mono = channel_mode == 3
+    if mpeg1:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    tag = frame[4 + side_info:8 + side_info]
+    return tag in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+
+def iter_audio_frames(data: bytes) -> Iterator[bytes]:
+    """Yield the audio frames of an MP3 file, skipping tags and info frames
+
+    Garbage between frames is skipped by scanning forward to the next header
+    that is followed by another valid header (or the end of the data).
+    """
+    end = len(data)
+    if end >= ID3V1_SIZE and data[end - ID3V1_SIZE:end - ID3V1_SIZE + 3] == b"TAG":
+        end -= ID3V1_SIZE
+    data = data[:end]
+
+    offset = _id3v2_size(data)
+    first = True
+    while offset < end:
+        header = parse_frame_header(data, offset)
+        if header is None or offset + header[0] > end:
+            offset = data.find(b"\xff", offset + 1)
+            if offset < 0:
+                break
+            continue
+
+        length, mpeg1, channel_mode = header
+        next_offset = offset + length
+        if next_offset < end and parse_frame_header(data, next_offset) is None:
+            # A false sync inside garbage; keep scanning
+            offset = data.find(b"\xff", offset + 1)
+            if offset < 0:
+                break
+            continue
+
+        frame = data[offset:next_offset]
+        if not (first and _is_info_frame(frame, mpeg1, channel_mode)):
+            yield frame
+        first = False
+        offset = next_offset
+
+
+def mp3_duration(data: bytes) -> float:
+    """Playing time of an MP3 file in seconds, counted from its audio frames"""
+    duration = 0.0
+    for frame in iter_audio_frames(data):
+        version = (frame[1] >> 3) & 0x03
+        layer = 4 - ((frame[1] >> 1) & 0x03)
+        sample_rate = SAMPLE_RATES[version][(frame[2] >> 2) & 0x03]
+        duration += SAMPLES_PER_FRAME[version == 3][layer] / sample_rate
+    return duration
+
+
+def concatenate_mp3(parts: List[bytes]) -> bytes:
+    """Join MP3 files into one stream by concatenating their frames
+
+    Nothing is re-encoded. Per-file ID3 tags and Xing/Info headers are
+    dropped, since they would describe only the first part and make players
+    stop or mis-seek at its end. A part with no recognisable frames is kept
+    as-is.
+    """
+    output = bytearray()
+    for index, part in enumerate(parts):
+        frames = list(iter_audio_frames(part))
+        if not frames:
+            logger.warning(f"No MP3 frames found in part {index} ({len(part)} bytes), appending raw bytes")
+            output += part
+            continue
+        for frame in frames:
+            output += frame
+    return bytes(output)
+
+
+def _strip_leading_metadata(data: bytes) -> Optional[bytes]:
+    """Drop a leading ID3v2 tag and Xing/Info frame, or None if more bytes are needed"""
+    if len(data) < 10:
+        return None
+    offset = _id3v2_size(data)
+    if len(data) < offset + 4:
+        return None
+
+    header = parse_frame_header(data, offset)
+    if header is None:
+        return data[offset:]
+    length, mpeg1, channel_mode = header
+    if len(data) < offset + length:
+        return None
+    if _is_info_frame(data[offset:offset + length], mpeg1, channel_mode):
+        offset += length
+    return data[offset:]
+
+
+async def strip_stream_metadata(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Streaming counterpart of iter_audio_frames for the start of an MP3 stream
+
+    Only the head of the stream is buffered; once the tag and info frame have
+    been dropped the remaining bytes are passed through untouched, so several
+    streams can be played back to back as one.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        if buffer is None:
+            yield chunk
+            continue
+        buffer += chunk
+        audio = _strip_leading_metadata(bytes(buffer))
+        if audio is None:
+            continue
+        buffer = None
+        if audio:
+            yield audio
+    if buffer:
+        yield bytes(buffer)
@@ -0,0 +1,122 @@
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+import asyncio
+import logging
+
+from .personality_profile import ProfileKey, normalize_answers
+
+logger = logging.getLogger(__name__)
+
+
+class OpeningPool:
+    """Pre-generated story openings per quiz profile, refilled in the background"""
+
+    def __init__(
+        self,
+        generate: Callable[[Dict[str, str]], Awaitable[str]],
+        low_watermark: int = 1,
+        high_watermark: int = 3,
+        max_profiles: int = 256,
+        workers: int = 2
+    ):
+        self.generate = generate
+        self.low_watermark = low_watermark
+        self.high_watermark = max(high_watermark, low_watermark + 1)
+        self.max_profiles = max_profiles
+        self.worker_count = workers
+
+        # Openings per profile, most recently requested profile last
+        self._pools: "OrderedDict[ProfileKey, Deque[str]]" = OrderedDict()
+        self._answers: Dict[ProfileKey, Dict[str, str]] = {}
+        self._refill_queue: "asyncio.Queue[ProfileKey]" = asyncio.Queue()
+        self._scheduled = set()
+        self._workers: List[asyncio.Task] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_failures = 0
+
+    def take(self, quiz_answers: Dict[str, str]) -> Optional[str]:
+        """Return a pooled opening for these answers, or None if the pool is empty"""
+        key = normalize_answers(quiz_answers)
+        pool = self._track(key, quiz_answers)
+
+        opening = pool.popleft() if pool else None
+        if opening:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        if len(pool) <= self.low_watermark:
+            self._schedule_refill(key)
+        return opening
+
+    def _track(self, key: ProfileKey, quiz_answers: Dict[str, str]) -> Deque[str]:
+        """Remember a requested profile, evicting the least recently requested one"""
+        pool = self._pools.get(key)
+        if pool is not None:
+            self._pools.move_to_end(key)
+            return pool
+
+        pool = deque()
+        self._pools[key] = pool
+        self._answers[key] = dict(quiz_answers)
+        if len(self._pools) > self.max_profiles:
+            evicted, _ = self._pools.popitem(last=False)
+            self._answers.pop(evicted, None)
+        return pool
+
+    def _schedule_refill(self, key: ProfileKey) -> None:
+        if key not in self._scheduled and self._workers:
+            self._scheduled.add(key)
+            self._refill_queue.put_nowait(key)
+
+    async def _refill(self, key: ProfileKey) -> None:
+        """Top a profile's pool up to the high watermark"""
+        while key in self._pools and len(self._pools[key]) < self.high_watermark:
+            opening = await self.generate(self._answers[key])
+            pool = self._pools.get(key)
+            if pool is None:
+                return
+            pool.append(opening)
+            self.refills += 1
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._refill_queue.get()
+            try:
+                await self._refill(key)
+            except Exception as e:
+                self.refill_failures += 1
+                logger.warning(f"Failed to refill opening pool: {str(e)}")
+            finally:
+                self._scheduled.discard(key)
+                self._refill_queue.task_done()
+
+    def start(self) -> None:
+        """Start the background refill workers"""
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+            logger.info(f"Opening pool started with {self.worker_count} refill workers")
+
+    async def stop(self) -> None:
+        """Stop the background refill workers"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return pool statistics for monitoring"""
+        return {
+            "profiles": len(self._pools),
+            "pooled_openings": sum(len(pool) for pool in self._pools.values()),
+            "refill_queue": self._refill_queue.qsize(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refills": self.refills,
+            "refill_failures": self.refill_failures,
+            "low_watermark": self.low_watermark,
+            "high_watermark": self.high_watermark
+        }
@@ -7,9 +7,23 @@ import tempfile
 import re
 from PIL import Image, ImageDraw, ImageFont
 import textwrap
+import threading
+import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
+# 折り返し可能な位置（この文字の直後で改行できる）
+BREAK_CHARS = frozenset(['。', '、', '！', '？', '.', ',', '!', '?', ' ', '　'])
+
+# PDF生成で使うフォント（サイズ, ウェイト）。起動時にまとめて読み込む
+PDF_FONTS = [(36, "bold"), (24, "bold"), (18, "regular"), (12, "regular")]
+
+# 読み込んだフォントと背景画像はプロセス全体で共有する
+_font_cache = {}        # (パス, サイズ) -> フォント
+_background_cache = {}  # パス -> デコード済みRGB画像
+_cache_lock = threading.Lock()
+
 class PDFService:
     def __init__(self):
         # 背景PNG画像ファイルの候補パス
@@ -33,6 +47,9 @@ class PDFService:
         # フォントファイルの候補パス
         self.font_paths = self._get_font_paths()
         
+        # フォントごとの文字送り幅キャッシュ（フォントが破棄されると消える）
+        self._glyph_advances = weakref.WeakKeyDictionary()
+        
     def _get_font_paths(self):
         """利用可能なフォントパスを取得"""
         font_candidates = []
@@ -91,7 +108,7 @@ class PDFService:
             # logger.info(f"  Checking: {family} ({font_weight}) at {font_path}")
             if weight == font_weight or (weight == "regular" and font_weight in ["medium", "regular"]):
                 try:
-                    font = ImageFont.truetype(font_path, size)
+                    font = self._load_font(font_path, size)
                     # logger.info(f"  ✅ Successfully loaded: {font_path}")
                     return font
                 except Exception as e:
@@ -101,10 +118,65 @@ class PDFService:
         # フォールバック: デフォルトフォント
         logger.warning("All fonts failed, using default font")
         try:
-            return ImageFont.load_default()
+            return self._load_font(None, 0)
         except:
             return None
     
+    def _load_font(self, font_path, size):
+        """フォントを (パス, サイズ) 単位でキャッシュして読み込む（パスがNoneならデフォルトフォント）"""
+        key = (font_path, size)
+        with _cache_lock:
+            font = _font_cache.get(key)
+            if font is None:
+                font = ImageFont.truetype(font_path, size) if font_path else ImageFont.load_default()
+                _font_cache[key] = font
+            return font
+    
+    def _get_background(self):
+        """背景画像をRGBにデコードしたもの（共有されるため、描画にはcopy()を使う）"""
+        path = self.background_png_path
+        with _cache_lock:
+            background = _background_cache.get(path)
+            if background is None:
+                with Image.open(path) as image:
+                    # PDF保存時にRGBへ変換していたので、先に変換しておいても結果は同じ
+                    background = image.convert('RGB')
+                _background_cache[path] = background
+            return background
+    
+    def warm_up(self):
+        """背景画像とPDF用フォントを事前に読み込む（最初のPDF生成を速くするため）"""
+        started = time.perf_counter()
+        try:
+            if self.background_png_path:
+                self._get_background()
+            for size, weight in PDF_FONTS:
+                self._get_font(size, weight)
+        except Exception as e:
+            logger.warning(f"PDF warm-up failed: {str(e)}")
+            return
+        logger.info(f"PDF resources warmed up in {(time.perf_counter() - started) * 1000:.0f} ms: {self.get_stats()}")
+    
+    def get_stats(self):
+        """キャッシュしているフォントと背景画像のメモリ使用量（概算）"""
+        with _cache_lock:
+            font_paths = {path for path, _ in _font_cache if path}
+            backgrounds = list(_background_cache.values())
+            font_count = len(_font_cache)
+        font_file_bytes = 0
+        for path in font_paths:
+            try:
+                font_file_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        return {
+            "fonts": font_count,
+            "font_file_bytes": font_file_bytes,
+            "backgrounds": len(backgrounds),
+            "background_bytes": sum(image.width * image.height * len(image.getbands()) for image in backgrounds),
+            "glyph_advance_entries": sum(len(advances) for advances in list(self._glyph_advances.values()))
+        }
+    
     def generate_pdf(self, story_content: str) -> bytes:
         """Generate PDF from story content using image-based approach"""
         try:
@@ -138,8 +210,8 @@ class PDFService:
     def _generate_pdf_with_image(self, story_content: str) -> bytes:
         """画像ベースでPDFを生成"""
         try:
-            # 背景画像を読み込み
-            background = Image.open(self.background_png_path)
+            # 背景画像（起動時に読み込み済み、各ページはそのコピー）
+            background = self._get_background()
             logger.info(f"Background image size: {background.size}")
             
             # 画像サイズ（幅1024px、高さ1536px）
@@ -264,67 +336,76 @@ class PDFService:
             logger.error(f"Error in _generate_pdf_with_image: {str(e)}")
             raise
     
+    def _get_glyph_advances(self, font):
+        """フォントの文字送り幅キャッシュ（文字 -> 幅）を取得"""
+        advances = self._glyph_advances.get(font)
+        if advances is None:
+            advances = {}
+            self._glyph_advances[font] = advances
+        return advances
+    
     def _wrap_text(self, text, font, max_width):
-        """テキストを指定幅で折り返し（日本語対応）"""
+        """テキストを指定幅で折り返し（日本語対応）
+        
+        行幅は文字ごとの送り幅をキャッシュして足し合わせるため、
+        段落の長さに対して線形時間で折り返せる。
+        """
         if not font:
             # フォントが利用できない場合は文字数で分割
             return textwrap.wrap(text, width=25)  # さらに安全な文字数に調整
         
+        advances = self._get_glyph_advances(font)
+        
+        def line_width(line):
+            width = 0.0
+            for c in line:
+                advance = advances.get(c)
+                if advance is None:
+                    advance = advances[c] = font.getlength(c)
+                width += advance
+            return width
+        
         lines = []
         current_line = ""
+        current_width = 0.0
         
-        # 日本語と英語の混在テキストに対応
-        # 句読点や区切り文字で分割可能な位置を特定
-        break_chars = ['。', '、', '！', '？', '.', ',', '!', '?', ' ', '　']
-        
-        i = 0
-        while i < len(text):
-            char = text[i]
-            test_line = current_line + char
-            
-            try:
-                # 実際の幅を測定
-                bbox = font.getbbox(test_line)
-                line_width = bbox[2] - bbox[0]
+        try:
+            for char in text:
+                advance = advances.get(char)
+                if advance is None:
+                    advance = advances[char] = font.getlength(char)
                 
-                if line_width <= max_width:
-                    current_line = test_line
-                    i += 1
-                else:
-                    # 幅を超えた場合の処理
-                    if current_line:
-                        # 可能であれば適切な位置で改行
-                        break_pos = -1
-                        for j in range(len(current_line) - 1, -1, -1):
-                            if current_line[j] in break_chars:
-                                break_pos = j + 1
-                                break
-                        
-                        if break_pos > 0 and break_pos < len(current_line):
-                            # 適切な位置で分割
-                            lines.append(current_line[:break_pos].strip())
-                            current_line = current_line[break_pos:].strip() + char
-                        else:
-                            # 分割位置が見つからない場合は現在の行で分割
-                            lines.append(current_line.strip())
-                            current_line = char
-                        i += 1
+                if current_width + advance <= max_width:
+                    current_line += char
+                    current_width += advance
+                    continue
+                
+                # 幅を超えた場合の処理
+                if current_line:
+                    # 可能であれば直前の句読点・空白の後ろで改行
+                    break_pos = -1
+                    for j in range(len(current_line) - 1, -1, -1):
+                        if current_line[j] in BREAK_CHARS:
+                            break_pos = j + 1
+                            break
+                    
+                    if 0 < break_pos < len(current_line):
+                        lines.append(current_line[:break_pos].strip())
+                        current_line = current_line[break_pos:].strip() + char
+                        current_width = line_width(current_line)
                     else:
-                        # 単一文字でも幅を超える場合（通常は発生しない）
-                        current_line = char
-                        i += 1
-            except:
-                # フォント測定に失敗した場合は文字数で判定
-                if len(test_line) <= 25:  # 安全な文字数制限
-                    current_line = test_line
-                    i += 1
-                else:
-                    if current_line:
+                        # 分割位置が見つからない場合は現在の行で分割
                         lines.append(current_line.strip())
                         current_line = char
-                    else:
-                        current_line = char
-                    i += 1
+                        current_width = advance
+                else:
+                    # 単一文字でも幅を超える場合（通常は発生しない）
+                    current_line = char
+                    current_width = advance
+        except Exception as e:
+            # フォント測定に失敗した場合は文字数で分割
+            logger.warning(f"Failed to measure text width, wrapping by character count: {str(e)}")
+            return textwrap.wrap(text, width=25)
         
         # 最後の行を追加
         if current_line.strip():
@@ -0,0 +1,226 @@
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# Compiled personality profiles.
+# Prompt text depends only on the quiz answers, so the answer tables live at
+# module level and each distinct answer set is rendered once and memoized.
+
+# Maximum number of distinct answer sets kept in the profile cache
+PROFILE_CACHE_SIZE = 4096
+
+# Mapping of answers to story preferences
+PREFERENCES = {
+    'q1': {
+        'a': '閉鎖された古い洋館や病院などの不気味な建物',
+        'b': '日常に潜む歪みや違和感',
+        'c': '未知の生物が潜む自然環境'
+    },
+    'q2': {
+        'a': 'じわじわと精神を追い詰める心理的恐怖',
+        'b': '目に見える怪物や幽霊からの直接的な恐怖',
+        'c': '理解不能な超常現象や不条理な恐怖'
+    },
+    'q3': {
+        'a': 'ごく普通の一般人で、恐怖に翻弄される主人公',
+        'b': '恐怖の謎を解き明かそうとする探究心のある主人公',
+        'c': '特殊な能力で恐怖に立ち向かう強い主人公'
+    },
+    'q4': {
+        'a': '不気味な音を立てる古い人形',
+        'b': '持つ者の運命を狂わせる曰く付きの鏡',
+        'c': '謎の文字が書かれた古文書'
+    },
+    'q5': {
+        'a': '過去の悲劇や怨念',
+        'b': '科学では説明できない呪い',
+        'c': '人間の狂気や悪意'
+    },
+    'q6': {
+        'a': 'ゆっくりと静かに恐怖が忍び寄るスローペース',
+        'b': '次々と事件が起こるジェットコースター展開',
+        'c': '静と動が巧みに切り替わる緩急のある展開'
+    },
+    'q7': {
+        'a': '何かを知っているようで話さない謎めいた老人',
+        'b': '主人公を惑わす美しいが影のある人物',
+        'c': '純粋無垢だが、時折不気味な言動を見せる子供'
+    },
+    'q8': {
+        'a': '耳元で聞こえるはずのない囁き声（聴覚的恐怖）',
+        'b': '誰もいないはずなのに感じる視線（視覚的恐怖）',
+        'c': 'べっとりと肌にまとわりつくような嫌な感触（触覚的恐怖）'
+    },
+    'q9': {
+        'a': '主人公が絶望に叩き落とされるバッドエンド',
+        'b': '謎は残るが、日常には戻れるビターエンド',
+        'c': '恐怖の元凶を断ち切る希望のあるハッピーエンド'
+    },
+    'q10': {
+        'a': '読者に情け容赦なく、徹底的に恐怖を与える語り手',
+        'b': '読者を物語に引き込み、謎解きを促すガイド役',
+        'c': '時にユーモアを交えながらも、核心ではゾッとさせる語り手'
+    }
+}
+
+# Horror type analysis (q2)
+HORROR_TYPES = {
+    'a': '心理的恐怖主体 - 精神をじわじわといたぶる、内面から湧き上がる恐怖',
+    'b': '直接的恐怖主体 - 目に見える脇威、即座的な危険とショック',
+    'c': '超常恐怖主体 - 理解できない不条理、存在そのものへの恐怖'
+}
+
+# Ending preference analysis (q9)
+ENDING_PREFERENCES = {
+    'a': '絶望的結末希望 - 主人公が打ちのめされる強烈なバッドエンド',
+    'b': '曖昧的結末希望 - 謎が残り、不安が残るビターエンド',
+    'c': '希望的結末希望 - 恐怖を乗り越えるハッピーエンド'
+}
+
+# Setting elements (q1)
+SETTINGS = {
+    'a': '閉鎖空間系 - 古い建物、地下室、逃げ場のない狭い空間',
+    'b': '日常侵食系 - いつもの場所に潜む違和感、家、学校、職場',
+    'c': '自然環境系 - 森、山、湖、人里離れた場所での孤立感'
+}
+
+# Fear source (q5)
+FEAR_SOURCES = {
+    'a': '怨念系 - 過去の悲劇、死者の意思、歴史の闇',
+    'b': '呪い系 - 超自然的な力、不可解な現象、神秘的要素',
+    'c': '狂気系 - 人間の悪意、異常な行動、社会の闇'
+}
+
+# Sensory focus (q8)
+SENSORY_ELEMENTS = {
+    'a': '聴覚中心 - 怪音、囁き声、不気味な静寂で恐怖を編み出す',
+    'b': '視覚中心 - 影、動き、視線、見えてはいけないもので恐怖を作る',
+    'c': '触覚中心 - 不快な感触、温度変化、肩に最く気配で恐怖を喩起'
+}
+
+# Pacing (q6)
+PACING_STYLES = {
+    'a': 'スロービルド - じっくりと不安を積み重ね、緊張感を持続',
+    'b': 'ラピッド展開 - 次々と起こる事件、スピーディな展開',
+    'c': '緩急自在 - 静と動の切り替え、リズムのある展開'
+}
+
+# Narrative styles (q10)
+NARRATIVE_STYLES = {
+    'a': '「容赦なき語り手」 - 読者を突き放し、情け無用の恐怖を叩き込む。直接的で強烈な描写を使い、読者の精神を追い詰める。',
+    'b': '「ガイド型語り手」 - 読者を物語に引き込み、謎解きへと導く。教育的でありながら、恐怖の真相を明かしていく。',
+    'c': '「ユーモア混在語り手」 - 時に軽妙なユーモアを散りばめながら、油断させた隠で真の恐怖を仕掛ける。'
+}
+
+ProfileKey = Tuple[Tuple[str, Optional[str]], ...]
+
+
+def normalize_answers(quiz_answers: Dict[str, str]) -> ProfileKey:
+    """Normalize quiz answers into a hashable cache key
+
+    Unknown question ids are dropped and unknown answers collapse to None.
+    Answer order is kept because it determines the order of the traits list.
+    """
+    return tuple(
+        (q_id, answer if answer in PREFERENCES[q_id] else None)
+        for q_id, answer in quiz_answers.items()
+        if q_id in PREFERENCES
+    )
+
+
+def analyze_horror_profile(answers: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """Analyze user's horror preferences and create profile"""
+    # Intensity level (combination of q2, q6, q10)
+    q2_ans = answers.get('q2', 'a')
+    q6_ans = answers.get('q6', 'a')
+    q9_ans = answers.get('q9', 'a')
+    q10_ans = answers.get('q10', 'a')
+    
+    # Determine intensity based on answers
+    if q2_ans == 'a' and q10_ans == 'a':
+        intensity = 'MAX強度 - 容赦なく、最大限の恐怖を与える'
+    elif q2_ans == 'b' and q6_ans == 'b':
+        intensity = 'HIGH強度 - アクション重視で強烈な恐怖を与える'
+    elif q2_ans == 'c':
+        intensity = 'MIND強度 - 理解不能な不条理で精神を攻める'
+    else:
+        intensity = 'MID強度 - バランスの取れた恐怖体験を提供'
+    
+    return {
+        'horror_type': HORROR_TYPES.get(q2_ans, HORROR_TYPES['a']),
+        'ending_preference': ENDING_PREFERENCES.get(q9_ans, ENDING_PREFERENCES['b']),
+        'intensity_level': intensity
+    }
+
+
+def generate_story_elements(answers: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """Generate specific story elements based on quiz answers"""
+    return {
+        'setting': SETTINGS.get(answers.get('q1', 'a'), SETTINGS['a']),
+        'fear_source': FEAR_SOURCES.get(answers.get('q5', 'a'), FEAR_SOURCES['a']),
+        'sensory_focus': SENSORY_ELEMENTS.get(answers.get('q8', 'a'), SENSORY_ELEMENTS['a']),
+        'pacing': PACING_STYLES.get(answers.get('q6', 'a'), PACING_STYLES['a'])
+    }
+
+
+def determine_narrative_style(answers: Dict[str, Optional[str]]) -> str:
+    """Determine narrative style based on q10 answer"""
+    return NARRATIVE_STYLES.get(answers.get('q10', 'b'), NARRATIVE_STYLES['b'])
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def compile_personality_prompt(key: ProfileKey) -> str:
+    """Render the personality prompt for a normalized answer set"""
+    answers = dict(key)
+    horror_profile = analyze_horror_profile(answers)
+    story_elements = generate_story_elements(answers)
+    narrative_style = determine_narrative_style(answers)
+    
+    # Create comprehensive personality prompt
+    prompt_parts = [
+        "【ユーザーホラープロファイル】",
+        f"恐怖タイプ: {horror_profile['horror_type']}",
+        f"結末好み: {horror_profile['ending_preference']}",
+        f"恐怖強度: {horror_profile['intensity_level']}",
+        "",
+        "【物語要素指定】",
+        f"舞台: {story_elements['setting']}",
+        f"恐怖の源: {story_elements['fear_source']}",
+        f"五感刺激: {story_elements['sensory_focus']}",
+        f"ペース: {story_elements['pacing']}",
+        "",
+        "【語りスタイル】",
+        narrative_style,
+        "",
+        "【ユーザー回答詳細】"
+    ]
+    
+    # Add traditional traits
+    for q_id, answer in key:
+        if answer is not None:
+            prompt_parts.append(f"- {PREFERENCES[q_id][answer]}")
+    
+    return "\n".join(prompt_parts)
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _lookup_raw_answers(raw_answers: Tuple[Tuple[str, str], ...]) -> str:
+    """Fast path keyed on the answers exactly as received"""
+    return compile_personality_prompt(normalize_answers(dict(raw_answers)))
+
+
+def build_personality_prompt(quiz_answers: Dict[str, str]) -> str:
+    """Create a personality prompt based on quiz answers (memoized)"""
+    return _lookup_raw_answers(tuple(quiz_answers.items()))
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Return profile cache statistics for monitoring"""
+    lookups = _lookup_raw_answers.cache_info()
+    profiles = compile_personality_prompt.cache_info()
+    return {
+        "hits": lookups.hits,
+        "misses": lookups.misses,
+        "size": lookups.currsize,
+        "compiled_profiles": profiles.currsize,
+        "max_size": lookups.maxsize
+    }
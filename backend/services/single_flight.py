@@ -0,0 +1,54 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Share one in-flight operation among concurrent callers with the same key"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.joined = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        """Remove a finished task and mark its exception as retrieved"""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Single-flight operation {key} failed: {str(task.exception())}")
+
+    def start(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> asyncio.Task:
+        """Start an operation in the background unless one is already running"""
+        task = self._tasks.get(key)
+        if task is not None:
+            self.joined += 1
+            return task
+
+        task = asyncio.ensure_future(func())
+        self._tasks[key] = task
+        task.add_done_callback(lambda finished: self._forget(key, finished))
+        self.started += 1
+        return task
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Run an operation, or wait for the identical one already in flight"""
+        task = self.start(key, func)
+        # Shield so that one caller disconnecting does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def get(self, key: Hashable) -> Optional[asyncio.Task]:
+        """Return the in-flight task for a key, if any"""
+        return self._tasks.get(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return statistics for monitoring"""
+        return {
+            "in_flight": len(self._tasks),
+            "started": self.started,
+            "joined": self.joined
+        }
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate for Japanese prompts (about 1.3 characters per token)
+CHARS_PER_TOKEN = 1.3
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a prompt"""
+    return int(len(text) / CHARS_PER_TOKEN)
+
+
+class StoryContext:
+    """Rendered conversation for one story, extended as new messages arrive"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything rendered so far"""
+        self.message_count = 0
+        self.user_turns = 0
+        self.added_messages = 0
+        self.last_content: Optional[str] = None
+        self.chat_transcript = ""
+        self.final_transcript = ""
+        # Size of the last prompt per label ("continuation", "final"), for logging
+        self.last_prompt_chars: Dict[str, int] = {}
+
+    def _matches(self, chat_history: List[Dict[str, str]]) -> bool:
+        """Check that the rendered prefix still matches the stored history"""
+        if self.message_count > len(chat_history):
+            return False
+        if self.message_count == 0:
+            return True
+        return chat_history[self.message_count - 1]["content"] == self.last_content
+
+    def sync(self, chat_history: List[Dict[str, str]]) -> int:
+        """Render messages not seen yet and return how many were added"""
+        if not self._matches(chat_history):
+            logger.info("Story context out of sync with chat history, rebuilding")
+            self.reset()
+
+        new_messages = chat_history[self.message_count:]
+        chat_parts = [self.chat_transcript]
+        final_parts = [self.final_transcript]
+        for msg in new_messages:
+            is_model = msg["role"] == "model"
+            chat_parts.append(f"{'語り部' if is_model else 'あなた'}: {msg['content']}\n\n")
+            final_parts.append(f"【{'語り部' if is_model else 'あなたの行動'}】\n{msg['content']}\n\n")
+            if not is_model:
+                self.user_turns += 1
+
+        if new_messages:
+            self.chat_transcript = "".join(chat_parts)
+            self.final_transcript = "".join(final_parts)
+            self.message_count = len(chat_history)
+            self.last_content = chat_history[-1]["content"]
+
+        self.added_messages = len(new_messages)
+        return self.added_messages
+
+
+class StoryContextCache:
+    """Bounded LRU cache of StoryContext objects keyed by story ID"""
+
+    def __init__(self, max_stories: int = 1000):
+        self.max_stories = max_stories
+        self._contexts: "OrderedDict[str, StoryContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, story_id: str) -> StoryContext:
+        """Return the context for a story, creating it if needed"""
+        context = self._contexts.get(story_id)
+        if context is not None:
+            self._contexts.move_to_end(story_id)
+            self.hits += 1
+            return context
+
+        self.misses += 1
+        context = StoryContext()
+        self._contexts[story_id] = context
+        if len(self._contexts) > self.max_stories:
+            self._contexts.popitem(last=False)
+        return context
+
+    def discard(self, story_id: str) -> None:
+        """Drop the cached context for a finished story"""
+        self._contexts.pop(story_id, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return cache statistics for monitoring"""
+        return {
+            "stories": len(self._contexts),
+            "max_stories": self.max_stories,
+            "hits": self.hits,
+            "misses": self.misses
+        }
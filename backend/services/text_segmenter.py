@@ -0,0 +1,77 @@
+from typing import List, Sequence, Tuple, Union
+
+# Sentence ends (Japanese and ASCII) and newlines
+SENTENCE_ENDS = ("。", "！", "？", "!", "?", ".", "\n")
+
+# Places to break an overlong sentence before resorting to a hard cut
+SOFT_BREAKS = ("、", "，", ",", "　", " ")
+
+# Closing brackets and quotes that belong to the sentence before them
+CLOSERS = frozenset("」』）)\"'”")
+
+
+def _last_break(text: str, start: int, end: int, marks: Tuple[str, ...]) -> int:
+    """Offset just past the last mark in text[start:end], or -1
+
+    str.rfind works on the window in place, scanning back from its end only
+    until it finds a mark, so no copies of the text are made.
+    """
+    best = -1
+    for mark in marks:
+        position = text.rfind(mark, start, end)
+        # A period between digits is a decimal point, not a sentence end
+        while mark == "." and position > start and position + 1 < len(text) and text[position + 1].isdigit():
+            position = text.rfind(mark, start, position)
+        if position >= 0 and position + 1 > best:
+            best = position + 1
+    return best
+
+
+def segment_text(text: str, max_chars: Union[int, Sequence[int]]) -> List[Tuple[int, int]]:
+    """Split text into (start, end) spans of at most max_chars characters
+
+    max_chars may also be a schedule of limits: chunk i may hold up to
+    max_chars[i] characters, and the last limit applies to every later chunk.
+
+    Whole sentences are packed greedily into each span, walking the text
+    front to back with bounded in-place searches, so the cost is linear in
+    the length of the text. A sentence longer than max_chars is broken at
+    the last comma or space that fits, and only text with neither is cut at
+    exactly max_chars, so the split always terminates. Spans are trimmed of surrounding
+    whitespace; text[start:end] is the chunk itself.
+    """
+    schedule = [max_chars] if isinstance(max_chars, int) else list(max_chars)
+    if len(text) <= schedule[0]:
+        return [(0, len(text))]
+
+    spans = []
+    start = len(text) - len(text.lstrip())
+    stop = len(text.rstrip())
+    limit = schedule[0]
+
+    while stop - start > limit:
+        window_end = start + limit
+        end = _last_break(text, start, window_end, SENTENCE_ENDS)
+        if end > 0:
+            # Keep closing quotes with their sentence when they still fit
+            while end < window_end and text[end] in CLOSERS:
+                end += 1
+        else:
+            end = _last_break(text, start, window_end, SOFT_BREAKS)
+        if end <= start:
+            end = window_end
+
+        chunk_end = end
+        while chunk_end > start and text[chunk_end - 1].isspace():
+            chunk_end -= 1
+        if chunk_end > start:
+            spans.append((start, chunk_end))
+            limit = schedule[min(len(spans), len(schedule) - 1)]
+
+        start = end
+        while start < stop and text[start].isspace():
+            start += 1
+
+    if start < stop:
+        spans.append((start, stop))
+    return spans
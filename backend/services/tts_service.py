@@ -1,11 +1,48 @@
 import os
+import asyncio
 import logging
+import json
 import hashlib
-from openai import OpenAI
-from typing import Optional, Tuple
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from typing import AsyncIterator, List, Optional, Tuple
+
+from .audio_store import AudioStore
+from .mp3_utils import concatenate_mp3, mp3_duration, strip_stream_metadata
+from .text_segmenter import segment_text
 
 logger = logging.getLogger(__name__)
 
+# Primary TTS model; part of the audio cache key
+TTS_MODEL = "gpt-4o-mini-tts"
+# Voices and speed range accepted by the OpenAI speech API
+TTS_VOICES = frozenset(["alloy", "ash", "ballad", "coral", "echo", "fable", "nova", "onyx", "sage", "shimmer", "verse"])
+MIN_TTS_SPEED = 0.25
+MAX_TTS_SPEED = 4.0
+
+# Used when TTS_MODEL fails; its audio is cached under its own key
+FALLBACK_TTS_MODEL = "tts-1"
+
+# Longest chunk gpt-4o-mini-tts reliably accepts (~1800 tokens of Japanese)
+MAX_CHUNK_CHARS = 2300
+
+# Enhanced horror-specific instructions for gpt-4o-mini-tts
+HORROR_INSTRUCTIONS = (
+    "このホラー小説を深く不気味な声で読み上げてください。"
+    "恐怖場面では声を低く、ささやくように読み、"
+    "サスペンス場面では劇的な間を取り、"
+    "緊張を高めるためにゆっくりと話してください。"
+    "感情を込めて、聞き手を恐怖の世界に引き込んでください。"
+)
+
+def synthesis_speed(speed: float) -> float:
+    """Speed actually sent to TTS_MODEL for a requested speed"""
+    return max(0.7, speed - 0.1)
+
+def _file_duration(path: str) -> float:
+    with open(path, "rb") as f:
+        return mp3_duration(f.read())
+
 class TTSService:
     def __init__(self):
         """Initialize OpenAI TTS service"""
@@ -13,27 +50,81 @@ class TTSService:
         self.client = None
         self.enabled = False
         
+        # Chunk fan-out settings
+        self.max_parallel = int(os.getenv("TTS_MAX_PARALLEL", "3"))
+        self.chunk_retries = int(os.getenv("TTS_CHUNK_RETRIES", "2"))
+        self.stream_chunk_size = int(os.getenv("TTS_STREAM_CHUNK_SIZE", "4096"))
+        
+        # Chunk size limits in order: a short first chunk starts playback
+        # sooner, later chunks grow toward the model limit
+        self.chunk_schedule = self._parse_chunk_schedule(os.getenv("TTS_CHUNK_SCHEDULE", "300,2300"))
+        
+        # HTTP settings for the OpenAI client; chunks are short, so a request
+        # that takes longer than the read timeout is better retried elsewhere
+        self.connect_timeout = float(os.getenv("TTS_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.getenv("TTS_READ_TIMEOUT", "60"))
+        self.api_max_retries = int(os.getenv("TTS_API_MAX_RETRIES", "1"))
+        self.max_connections = int(os.getenv("TTS_MAX_CONNECTIONS", "20"))
+        
+        # Content-addressed, size-bounded audio cache
+        self.store = AudioStore(
+            "static/audio",
+            # Not under static/: the index maps story IDs to their audio
+            os.getenv("AUDIO_STORE_STATE_DIR", "audio_state"),
+            max_bytes=int(os.getenv("AUDIO_STORE_MAX_MB", "512")) * 1024 * 1024
+        )
+        
         if not self.api_key:
             logger.warning("OPENAI_API_KEY environment variable not set - TTS functionality will be disabled")
             return
             
         try:
-            # Set the API key as environment variable for OpenAI client
-            os.environ["OPENAI_API_KEY"] = self.api_key
-            self.client = OpenAI()
+            # One pooled async HTTP client shared by every TTS request
+            self.client = AsyncOpenAI(
+                api_key=self.api_key,
+                max_retries=self.api_max_retries,
+                timeout=self._timeout(),
+                http_client=DefaultAsyncHttpxClient(
+                    timeout=self._timeout(),
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections
+                    )
+                )
+            )
             self.enabled = True
             logger.info("OpenAI TTS service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI client: {str(e)}")
             logger.warning("TTS functionality will be disabled")
     
+    @staticmethod
+    def _parse_chunk_schedule(value: str) -> list[int]:
+        """Parse a comma-separated list of chunk sizes, capped at the model limit"""
+        try:
+            schedule = [min(int(size), MAX_CHUNK_CHARS) for size in value.split(",") if size.strip()]
+            if schedule and all(size > 0 for size in schedule):
+                return schedule
+        except ValueError:
+            pass
+        logger.warning(f"Invalid TTS_CHUNK_SCHEDULE {value!r}, using fixed {MAX_CHUNK_CHARS}-character chunks")
+        return [MAX_CHUNK_CHARS]
+    
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+    
+    async def close(self) -> None:
+        """Close the pooled HTTP connections"""
+        if self.client:
+            await self.client.close()
+    
     async def generate_speech(
         self, 
         text: str, 
         voice: str = "onyx", 
         speed: float = 0.8,
         response_format: str = "mp3"
-    ) -> bytes:
+    ) -> Tuple[bytes, str]:
         """
         Generate speech from text using OpenAI TTS
         
@@ -44,7 +135,8 @@ class TTSService:
             response_format (str): Audio format (mp3, opus, aac, flac, wav, pcm)
         
         Returns:
-            bytes: Audio content as bytes
+            Tuple[bytes, str]: Audio content and the model that produced it
+            (FALLBACK_TTS_MODEL if TTS_MODEL failed), to key the cache on
         """
         if not self.enabled or not self.client:
             raise Exception("TTS service is not available. Please check OPENAI_API_KEY configuration.")
@@ -55,7 +147,7 @@ class TTSService:
             
             # For gpt-4o-mini-tts: estimate tokens (roughly 1.3 chars per token for Japanese)
             # Safe limit: 1800 tokens = ~2340 characters for Japanese text
-            safe_char_limit = 2300
+            safe_char_limit = MAX_CHUNK_CHARS
             
             if len(text) > safe_char_limit:
                 logger.warning(f"Text length {len(text)} exceeds safe limit of {safe_char_limit} characters for gpt-4o-mini-tts, truncating...")
@@ -70,42 +162,37 @@ class TTSService:
             
             logger.info(f"Generating speech for text of length {len(text)} with voice '{voice}' at speed {speed}")
             
-            # Enhanced horror-specific instructions for gpt-4o-mini-tts
+            model = TTS_MODEL
             try:
-                horror_instructions = (
-                    "このホラー小説を深く不気味な声で読み上げてください。"
-                    "恐怖場面では声を低く、ささやくように読み、"
-                    "サスペンス場面では劇的な間を取り、"
-                    "緊張を高めるためにゆっくりと話してください。"
-                    "感情を込めて、聞き手を恐怖の世界に引き込んでください。"
-                )
-                
-                response = self.client.audio.speech.create(
-                    model="gpt-4o-mini-tts",
+                response = await self.client.audio.speech.create(
+                    model=TTS_MODEL,
                     voice=voice,
                     input=text,
-                    instructions=horror_instructions,
-                    speed=max(0.7, speed - 0.1),  # Slightly slower for horror atmosphere
-                    response_format=response_format
+                    instructions=HORROR_INSTRUCTIONS,
+                    speed=synthesis_speed(speed),  # Slightly slower for horror atmosphere
+                    response_format=response_format,
+                    timeout=self._timeout()
                 )
                 logger.info("TTS API call successful with horror instructions")
             except Exception as e:
                 logger.error(f"TTS API call failed: {str(e)}")
                 # Fallback to basic TTS model if gpt-4o-mini-tts fails
-                logger.info("Falling back to tts-1 model...")
-                response = self.client.audio.speech.create(
-                    model="tts-1",
+                logger.info(f"Falling back to {FALLBACK_TTS_MODEL} model...")
+                model = FALLBACK_TTS_MODEL
+                response = await self.client.audio.speech.create(
+                    model=FALLBACK_TTS_MODEL,
                     voice=voice,
                     input=text,
                     speed=speed,
-                    response_format=response_format
+                    response_format=response_format,
+                    timeout=self._timeout()
                 )
             
             # Get audio content as bytes
             audio_content = response.content
-            logger.info(f"Successfully generated speech, audio size: {len(audio_content)} bytes")
+            logger.info(f"Successfully generated speech with {model}, audio size: {len(audio_content)} bytes")
             
-            return audio_content
+            return audio_content, model
             
         except Exception as e:
             logger.error(f"Error generating speech: {str(e)}")
@@ -136,52 +223,58 @@ class TTSService:
         
         return cleaned
     
-    def split_text_for_tts(self, text: str, safe_char_limit: int = 2300) -> list[str]:
+    def split_text_for_tts(self, text: str, safe_char_limit: Optional[int] = None) -> list[str]:
         """
         Split text into chunks suitable for TTS generation
         
         Args:
             text (str): Text to split
-            safe_char_limit (int): Maximum characters per chunk
+            safe_char_limit (Optional[int]): Maximum characters per chunk;
+                defaults to the configured chunk schedule
             
         Returns:
             list[str]: List of text chunks
         """
-        if len(text) <= safe_char_limit:
-            return [text]
+        return [chunk for _, _, chunk in self.split_text_spans(text, safe_char_limit)]
+    
+    def split_text_spans(self, text: str, safe_char_limit: Optional[int] = None) -> list[Tuple[int, int, str]]:
+        """
+        Split text like split_text_for_tts, keeping each chunk's position
         
-        chunks = []
-        remaining_text = text
+        Whole sentences are packed into each chunk in linear time (see
+        segment_text).
         
-        while len(remaining_text) > safe_char_limit:
-            # Find a good breaking point within the safe limit
-            chunk = remaining_text[:safe_char_limit]
-            
-            # Look for sentence endings
-            break_points = [
-                chunk.rfind('。'),
-                chunk.rfind('.'),
-                chunk.rfind('！'),
-                chunk.rfind('？'),
-                chunk.rfind('\n\n'),
-                chunk.rfind('\n')
-            ]
-            
-            best_break = max([bp for bp in break_points if bp > safe_char_limit * 0.7])
-            
-            if best_break > 0:
-                chunks.append(remaining_text[:best_break + 1].strip())
-                remaining_text = remaining_text[best_break + 1:].strip()
-            else:
-                # No good break point found, force split
-                chunks.append(chunk + "...")
-                remaining_text = remaining_text[safe_char_limit:]
-        
-        # Add the remaining text
-        if remaining_text.strip():
-            chunks.append(remaining_text.strip())
-        
-        return chunks
+        Returns:
+            list[Tuple[int, int, str]]: (start, end, chunk text) with offsets into text
+        """
+        limits = safe_char_limit or self.chunk_schedule
+        return [(start, end, text[start:end]) for start, end in segment_text(text, limits)]
+    
+    def build_chunk_manifest(self, novel_text: str) -> dict:
+        """
+        Clean and split a novel once, describing every chunk for the audio endpoints
+        
+        Returns:
+            dict: textHash, the chunk schedule used, a chunks list with each
+            chunk's text, offsets into the cleaned text and content hash, and
+            an audio map (chunk index -> settings -> URL) filled in as chunks
+            are synthesized
+        """
+        cleaned_text = self.clean_text_for_speech(novel_text)
+        return {
+            "textHash": hashlib.sha256(cleaned_text.encode("utf-8")).hexdigest(),
+            "schedule": list(self.chunk_schedule),
+            "chunks": [
+                {
+                    "text": chunk,
+                    "start": start,
+                    "end": end,
+                    "hash": hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+                }
+                for start, end, chunk in self.split_text_spans(cleaned_text)
+            ],
+            "audio": {}
+        }
     
     async def generate_speech_chunks(
         self, 
@@ -203,70 +296,247 @@ class TTSService:
         chunks = self.split_text_for_tts(text)
         logger.info(f"Splitting text into {len(chunks)} chunks for TTS generation")
         
-        audio_chunks = []
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Generating audio for chunk {i+1}/{len(chunks)}")
-            audio_content = await self.generate_speech(
-                text=chunk,
-                voice=voice,
-                speed=speed,
-                response_format=response_format
-            )
-            audio_chunks.append(audio_content)
-        
-        return audio_chunks
+        results = await self.synthesize_chunks(chunks, voice, speed, response_format)
+        return [audio for audio, _ in results]
 
-    def save_audio_file(self, audio_content: bytes, story_id: str, chunk_id: Optional[int] = None) -> str:
+    async def synthesize_chunks(
+        self,
+        chunks: list[str],
+        voice: str = "onyx",
+        speed: float = 0.8,
+        response_format: str = "mp3"
+    ) -> list[Tuple[bytes, str]]:
         """
-        Save audio content to disk and return the file URL
+        Synthesize text chunks concurrently (at most max_parallel at a time)
         
-        Args:
-            audio_content (bytes): Audio content to save
-            story_id (str): Story ID for filename
-            chunk_id (Optional[int]): Chunk ID if this is part of a series
-            
         Returns:
-            str: URL path to the saved audio file
+            list[Tuple[bytes, str]]: Audio and model for each chunk, in the same
+            order as the input
         """
-        # Create audio directory if it doesn't exist
-        audio_dir = "static/audio"
-        os.makedirs(audio_dir, exist_ok=True)
+        semaphore = asyncio.Semaphore(self.max_parallel)
         
-        # Generate filename
-        if chunk_id is not None:
-            filename = f"{story_id}_chunk_{chunk_id}.mp3"
-        else:
-            filename = f"{story_id}_complete.mp3"
+        async def synthesize(index: int, chunk: str) -> Tuple[bytes, str]:
+            async with semaphore:
+                for attempt in range(self.chunk_retries + 1):
+                    try:
+                        logger.info(f"Generating audio for chunk {index+1}/{len(chunks)} (attempt {attempt+1})")
+                        return await self.generate_speech(
+                            text=chunk,
+                            voice=voice,
+                            speed=speed,
+                            response_format=response_format
+                        )
+                    except Exception as e:
+                        if attempt >= self.chunk_retries:
+                            raise
+                        delay = 0.5 * (2 ** attempt)
+                        logger.warning(f"Chunk {index+1} failed ({str(e)}), retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
         
-        file_path = os.path.join(audio_dir, filename)
+        return await asyncio.gather(*(synthesize(i, chunk) for i, chunk in enumerate(chunks)))
+
+    async def generate_full_speech(
+        self,
+        text: str,
+        voice: str = "onyx",
+        speed: float = 0.8,
+        story_id: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """
+        Generate MP3 narration for text of any length
         
-        # Save audio content to file
-        with open(file_path, 'wb') as f:
-            f.write(audio_content)
+        The text is split into chunks; chunks already in the audio cache are
+        reused and the rest are synthesized concurrently and cached under the
+        model that produced them. The MP3 frames are then concatenated without
+        re-encoding.
         
-        logger.info(f"Audio file saved: {file_path} ({len(audio_content)} bytes)")
+        Returns:
+            Tuple[bytes, str]: A single MP3 stream covering the whole text, and
+            TTS_MODEL, or FALLBACK_TTS_MODEL if any chunk needed the fallback
+        """
+        chunks = self.split_text_for_tts(text)
+        keys = [self.generate_cache_key(chunk, voice, speed) for chunk in chunks]
+        audio_parts = [self.read_cached_audio(key) for key in keys]
         
-        # Return URL path (will be served by FastAPI static files)
-        return f"/static/audio/{filename}"
+        missing = [i for i, audio in enumerate(audio_parts) if audio is None]
+        logger.info(f"Narration needs {len(chunks)} chunks, {len(chunks) - len(missing)} cached")
+        narration_model = TTS_MODEL
+        if missing:
+            synthesized = await self.synthesize_chunks([chunks[i] for i in missing], voice, speed, "mp3")
+            for i, (audio, model) in zip(missing, synthesized):
+                audio_parts[i] = audio
+                if model != TTS_MODEL:
+                    narration_model = model
+                    keys[i] = self.generate_cache_key(chunks[i], voice, speed, model=model)
+                await self.save_audio_file(audio, keys[i], story_id)
+        
+        if len(audio_parts) == 1:
+            return audio_parts[0], narration_model
+        
+        audio_content = concatenate_mp3(audio_parts)
+        logger.info(f"Joined {len(audio_parts)} audio chunks into {len(audio_content)} bytes")
+        return audio_content, narration_model
 
-    def generate_cache_key(self, text: str, voice: str, speed: float) -> str:
-        """Generate a cache key for audio content"""
-        content = f"{text}_{voice}_{speed}"
-        return hashlib.md5(content.encode()).hexdigest()
-    
-    def get_cached_audio_url(self, story_id: str, chunk_id: Optional[int] = None) -> Optional[str]:
-        """Check if audio file already exists and return URL"""
-        audio_dir = "static/audio"
+    async def stream_speech(
+        self,
+        text: str,
+        voice: str = "onyx",
+        speed: float = 0.8,
+        response_format: str = "mp3",
+        models: Optional[List[str]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream speech for text of any length as the audio bytes arrive
+        
+        Chunks are synthesized one after another. For MP3 the ID3 tag and
+        Xing/Info header at the start of each chunk's stream are dropped so
+        the output plays as a single stream. If models is given, the model
+        used for each chunk is appended to it.
         
-        if chunk_id is not None:
-            filename = f"{story_id}_chunk_{chunk_id}.mp3"
-        else:
-            filename = f"{story_id}_complete.mp3"
+        Yields:
+            bytes: Audio data in arrival order
+        """
+        if not self.enabled or not self.client:
+            raise Exception("TTS service is not available. Please check OPENAI_API_KEY configuration.")
         
-        file_path = os.path.join(audio_dir, filename)
+        chunks = self.split_text_for_tts(text)
+        logger.info(f"Streaming speech for {len(chunks)} chunks with voice '{voice}' at speed {speed}")
         
-        if os.path.exists(file_path):
-            logger.info(f"Found cached audio file: {file_path}")
-            return f"/static/audio/{filename}"
+        for chunk in chunks:
+            stream = self._stream_chunk(chunk, voice, speed, response_format, models)
+            if response_format == "mp3":
+                stream = strip_stream_metadata(stream)
+            async for data in stream:
+                yield data
+
+    async def _stream_chunk(
+        self,
+        text: str,
+        voice: str,
+        speed: float,
+        response_format: str,
+        models: Optional[List[str]] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream one chunk, falling back to tts-1 if gpt-4o-mini-tts fails before any audio
         
-        return None 
\ No newline at end of file
+        The model that produced the audio is appended to models, if given.
+        """
+        if models is None:
+            models = []
+        started = False
+        try:
+            async for data in self._stream_from_api(
+                model=TTS_MODEL,
+                voice=voice,
+                input=text,
+                instructions=HORROR_INSTRUCTIONS,
+                speed=synthesis_speed(speed),  # Slightly slower for horror atmosphere
+                response_format=response_format
+            ):
+                if not started:
+                    started = True
+                    models.append(TTS_MODEL)
+                yield data
+        except Exception as e:
+            if started:
+                raise
+            logger.error(f"TTS streaming call failed: {str(e)}")
+            logger.info(f"Falling back to {FALLBACK_TTS_MODEL} model...")
+            models.append(FALLBACK_TTS_MODEL)
+            async for data in self._stream_from_api(
+                model=FALLBACK_TTS_MODEL,
+                voice=voice,
+                input=text,
+                speed=speed,
+                response_format=response_format
+            ):
+                yield data
+
+    async def _stream_from_api(self, **request) -> AsyncIterator[bytes]:
+        """Yield a streaming speech response's bytes as they arrive"""
+        async with self.client.audio.speech.with_streaming_response.create(
+            **request,
+            timeout=self._timeout()
+        ) as response:
+            async for data in response.iter_bytes(self.stream_chunk_size):
+                yield data
+
+    def generate_cache_key(
+        self,
+        text: str,
+        voice: str,
+        speed: float,
+        model: str = TTS_MODEL,
+        response_format: str = "mp3"
+    ) -> str:
+        """Generate a cache key for audio content from everything that affects it"""
+        content = json.dumps([text, voice, float(speed), model, response_format], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def audio_file_path(self, cache_key: str, response_format: str = "mp3") -> str:
+        """Path of the cached audio file for a cache key"""
+        return self.store.path(cache_key, response_format)
+
+    async def save_audio_file(
+        self,
+        audio_content: bytes,
+        cache_key: str,
+        story_id: Optional[str] = None,
+        response_format: str = "mp3"
+    ) -> str:
+        """
+        Save audio content to the cache and return the file URL
+        
+        Args:
+            audio_content (bytes): Audio content to save
+            cache_key (str): Key from generate_cache_key
+            story_id (Optional[str]): Story the audio belongs to, recorded in the index
+            response_format (str): Audio format, used as the file extension
+            
+        Returns:
+            str: URL path to the saved audio file
+        """
+        # Writing and hashing run off the event loop; only the index update runs on it
+        temp_path, digest = await asyncio.to_thread(self.store.write_temp, audio_content, cache_key, response_format)
+        audio_url = self.store.commit(temp_path, cache_key, story_id, response_format, digest)
+        logger.info(f"Audio file saved: {audio_url} ({len(audio_content)} bytes)")
+        return audio_url
+
+    async def commit_audio_file(
+        self,
+        temp_path: str,
+        cache_key: str,
+        story_id: Optional[str] = None,
+        response_format: str = "mp3"
+    ) -> str:
+        """Move a fully written file into the cache and return its URL"""
+        digest = await asyncio.to_thread(self.store.hash_file, temp_path)
+        return self.store.commit(temp_path, cache_key, story_id, response_format, digest)
+
+    def get_cached_audio_url(self, cache_key: str, response_format: str = "mp3") -> Optional[str]:
+        """Check if audio for a cache key already exists and return URL"""
+        audio_url = self.store.lookup(cache_key, response_format)
+        if audio_url:
+            logger.info(f"Found cached audio file: {audio_url}")
+        return audio_url
+
+    def has_cached_audio(self, cache_key: str, response_format: str = "mp3") -> bool:
+        """Check if audio for a cache key is stored, e.g. to report its status"""
+        return self.store.contains(cache_key, response_format)
+
+    async def get_audio_duration(self, cache_key: str) -> Optional[float]:
+        """Playing time in seconds of cached MP3 audio, or None if it is not stored"""
+        if not self.store.contains(cache_key):
+            return None
+        duration = self.store.get_duration(cache_key)
+        if duration is None:
+            try:
+                duration = await asyncio.to_thread(_file_duration, self.store.path(cache_key))
+            except FileNotFoundError:
+                return None
+            self.store.set_duration(cache_key, duration)
+        return duration
+
+    def read_cached_audio(self, cache_key: str, response_format: str = "mp3") -> Optional[bytes]:
+        """Return cached audio content for a cache key, if any"""
+        return self.store.read(cache_key, response_format)
@@ -23,6 +23,8 @@ type StoryAction =
   | { type: 'SET_QUIZ_ANSWERS'; payload: QuizAnswers }
   | { type: 'SET_STORY_ID'; payload: string }
   | { type: 'ADD_MESSAGE'; payload: ChatMessage }
+  | { type: 'APPEND_TO_LAST_MESSAGE'; payload: string }
+  | { type: 'REMOVE_LAST_MESSAGE' }
   | { type: 'SET_LOADING'; payload: boolean }
   | { type: 'SET_ERROR'; payload: string | null }
   | { type: 'INCREMENT_TURN' }
@@ -49,6 +51,20 @@ function storyReducer(state: StoryState, action: StoryAction): StoryState {
         ...state, 
         chatHistory: [...state.chatHistory, action.payload] 
       }
+    case 'APPEND_TO_LAST_MESSAGE': {
+      const lastIndex = state.chatHistory.length - 1
+      if (lastIndex < 0) return state
+      const last = state.chatHistory[lastIndex]
+      return {
+        ...state,
+        chatHistory: [
+          ...state.chatHistory.slice(0, lastIndex),
+          { ...last, content: last.content + action.payload }
+        ]
+      }
+    }
+    case 'REMOVE_LAST_MESSAGE':
+      return { ...state, chatHistory: state.chatHistory.slice(0, -1) }
     case 'SET_LOADING':
       return { ...state, isLoading: action.payload }
     case 'SET_ERROR':
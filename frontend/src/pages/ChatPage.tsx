@@ -255,10 +255,23 @@ function ChatPage() {
     dispatch({ type: 'ADD_MESSAGE', payload: { role: 'user', content: userMessage } })
     dispatch({ type: 'INCREMENT_TURN' })
 
+    let started = false
     try {
-      const response = await storyApi.sendMessage(storyId, userMessage)
-      dispatch({ type: 'ADD_MESSAGE', payload: { role: 'model', content: response.reply } })
+      await storyApi.sendMessageStream(storyId, userMessage, (text) => {
+        // 最初のチャンク到着時に語り部のメッセージを追加し、以降は追記する
+        if (!started) {
+          started = true
+          setIsTyping(false)
+          dispatch({ type: 'ADD_MESSAGE', payload: { role: 'model', content: text } })
+        } else {
+          dispatch({ type: 'APPEND_TO_LAST_MESSAGE', payload: text })
+        }
+      })
     } catch (error) {
+      // 途中で失敗した応答はサーバーに保存されないため、表示からも取り除く
+      if (started) {
+        dispatch({ type: 'REMOVE_LAST_MESSAGE' })
+      }
       dispatch({ type: 'SET_ERROR', payload: 'メッセージの送信に失敗しました。' })
     } finally {
       setIsTyping(false)
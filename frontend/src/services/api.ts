@@ -35,6 +35,8 @@ export interface SendEmailResponse {
 export interface TTSOptions {
   voice?: string
   speed?: number
+  // opus is smaller but only available for individual chunks
+  response_format?: 'mp3' | 'opus'
 }
 
 export interface AudioChunkInfo {
@@ -45,10 +47,12 @@ export interface AudioChunkInfo {
 
 export interface AudioChunksResponse {
   total_chunks: number
+  chunk_schedule: number[]
   chunks_info: {
     chunk_id: number
     length: number
     preview: string
+    status: 'pending' | 'ready'
   }[]
 }
 
@@ -64,6 +68,11 @@ export interface AudioChunkResponse {
   cached: boolean
 }
 
+export interface AudioChunksBatchResponse {
+  chunks: AudioChunkResponse[]
+  total_chunks: number
+}
+
 export const storyApi = {
   startStory: async (quizAnswers: QuizAnswers): Promise<StartStoryResponse> => {
     const response = await api.post('/stories', { quizAnswers })
@@ -75,6 +84,59 @@ export const storyApi = {
     return response.data
   },
 
+  sendMessageStream: async (
+    storyId: string,
+    message: string,
+    onDelta: (text: string) => void
+  ): Promise<ChatResponse> => {
+    const response = await fetch(`${API_BASE_URL}/stories/${storyId}/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ message }),
+    })
+
+    if (!response.ok || !response.body) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`)
+    }
+
+    // Server-Sent Eventsを逐次パース
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      let separatorIndex
+      while ((separatorIndex = buffer.indexOf('\n\n')) !== -1) {
+        const rawEvent = buffer.slice(0, separatorIndex)
+        buffer = buffer.slice(separatorIndex + 2)
+
+        let eventType = 'message'
+        let data = ''
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event: ')) eventType = line.slice(7)
+          else if (line.startsWith('data: ')) data += line.slice(6)
+        }
+
+        const payload = data ? JSON.parse(data) : {}
+        if (eventType === 'delta') {
+          onDelta(payload.text)
+        } else if (eventType === 'done') {
+          return { reply: payload.reply }
+        } else if (eventType === 'error') {
+          throw new Error(payload.detail || 'Failed to process message')
+        }
+      }
+    }
+
+    throw new Error('Stream ended before completion')
+  },
+
   completeStory: async (storyId: string): Promise<CompleteStoryResponse> => {
     const response = await api.post(`/stories/${storyId}/complete`)
     return response.data
@@ -194,6 +256,16 @@ export const storyApi = {
       console.error('Audio chunk generation failed:', error);
       throw error;
     }
+  },
+
+  generateAudioChunks: async (
+    storyId: string,
+    start = 0,
+    end?: number,
+    options: TTSOptions = {}
+  ): Promise<AudioChunksBatchResponse> => {
+    const response = await api.post(`/stories/${storyId}/generate-audio-chunks`, { ...options, start, end })
+    return response.data
   }
 }
 